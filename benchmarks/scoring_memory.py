@@ -0,0 +1,137 @@
+"""
+Peak memory and time of the masked LM scoring modes:
+
+- `full` - `masked_logprob_score` with the full-vocabulary softmax
+- `lean` - `masked_logprob_score(..., lean=True)`
+- `batched-full-logits` - `masked_models.scoring.masked_logprob_scores` with the logits of all the positions, as for
+  the models without a head in `MASKED_LM_HEADS` (but with the `--max-batch-tokens` budget)
+- `batched` - `masked_models.scoring.masked_logprob_scores`
+
+Each mode runs in a separate process. The peak memory is measured above the memory used right before the scoring
+starts (i.e., with the model loaded), with `torch.cuda.max_memory_allocated` on GPU and by sampling the resident set
+size of the process in a background thread on CPU. The maximum absolute difference of the scores from the first mode
+(`full` by default) is reported as well.
+
+Usage (from the repository root):
+
+    PYTHONPATH=src python benchmarks/scoring_memory.py --model xlm-roberta-base --samples 200
+"""
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+
+
+MODES = ('full', 'lean', 'batched-full-logits', 'batched')
+
+
+class PeakMemory:
+    """
+    Context manager that measures the peak memory above the memory used when it is entered (`peak`, bytes).
+    """
+
+    def __init__(self, device, interval=0.001):
+        self.device = device
+        self.interval = interval
+        self.peak = 0
+
+
+    def __enter__(self):
+        import psutil
+        import torch
+
+        if self.device.startswith('cuda'):
+            torch.cuda.synchronize(self.device)
+            torch.cuda.reset_peak_memory_stats(self.device)
+            self.baseline = torch.cuda.memory_allocated(self.device)
+            return self
+
+        self.process = psutil.Process()
+        self.baseline = self.max_rss = self.process.memory_info().rss
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.max_rss = max(self.max_rss, self.process.memory_info().rss)
+
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        import torch
+
+        if self.device.startswith('cuda'):
+            torch.cuda.synchronize(self.device)
+            self.peak = torch.cuda.max_memory_allocated(self.device) - self.baseline
+            return
+
+        self.stopped.set()
+        self.thread.join()
+        self.max_rss = max(self.max_rss, self.process.memory_info().rss)
+        self.peak = self.max_rss - self.baseline
+
+
+def make_pairs(samples):
+    templates = (lambda s: f'He said: "{s}"', lambda s: f'She said: "{s}"')
+    sentences = [f'I have written {i} sentences for the benchmark and I am tired now.' for i in range(samples)]
+    return [(templates[0](sentence), templates[1](sentence)) for sentence in sentences]
+
+
+def run(mode, args, results):
+    from masked_models import scoring
+    from masked_models.scoring import masked_logprob_scores
+    from masked_models.utils import masked_logprob_score, model_init
+
+    model, tokenizer = model_init(args.model)
+    model = model.to(args.device).eval()
+    pairs = make_pairs(args.samples)
+
+    if mode == 'batched-full-logits':
+        scoring.MASKED_LM_HEADS = {}
+        scoring.MAX_BATCH_LOGITS = args.max_batch_tokens * model.config.vocab_size
+
+    start = time.perf_counter()
+    with PeakMemory(args.device) as memory:
+        if mode.startswith('batched'):
+            scores = masked_logprob_scores(pairs, tokenizer, model, args.device, max_batch_tokens=args.max_batch_tokens, bf16=args.bf16)
+        else:
+            scores = [
+                masked_logprob_score(sen1, sen2, tokenizer, model, args.device, lean=mode == 'lean', bf16=args.bf16)
+                for sen1, sen2 in pairs
+            ]
+    duration = time.perf_counter() - start
+
+    results.put((mode, scores, duration, memory.peak))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='xlm-roberta-base')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--max-batch-tokens', type=int, default=4096)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--bf16', action='store_true', help='Use bfloat16 autocast in the lean modes')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    outputs = {}
+    for mode in args.modes:
+        process = context.Process(target=run, args=(mode, args, results))
+        process.start()
+        while True:
+            try:
+                mode, scores, duration, memory = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not process.is_alive():
+                    raise SystemExit(f'The {mode} mode failed with exit code {process.exitcode}')
+        process.join()
+        outputs[mode] = scores
+        reference = outputs[args.modes[0]]
+        difference = max(abs(a - b) for a, b in zip(scores, reference))
+        print(f'{mode:>20} | {duration:8.2f} s | peak {memory / 2**20:10.1f} MB | max difference {difference:.2e}')
@@ -0,0 +1,119 @@
+"""
+Throughput benchmark for the `Translator` workflow (`load` -> `translate` -> `save`) against the local
+`FakeTranslator` backend. It measures the overhead of the base class separately from the remote APIs:
+
+- `translate/s` - sentences per second for translating new sentences end to end
+- `create_translations` - time per sentence spent in `create_translations`
+- `log_translation` and `cache.append` - time per sentence spent in logging and writing the cache
+- `cache hit` - time per sentence for `translate` when all the sentences are already translated
+- `save` and `load` - time of a single call
+- `peak memory` - peak Python memory allocated during the cold `translate` (measured in a separate run)
+
+Usage (from the repository root):
+
+    PYTHONPATH=src python benchmarks/translator_throughput.py --sizes 1000 10000 100000 --latency 0.01 --workers 8
+"""
+import argparse
+import logging
+import tempfile
+import time
+import tracemalloc
+
+from translators.fake import FakeTranslator
+
+
+def make_sentences(size):
+    return [f'Sentence number {i} that I have written for the benchmark.' for i in range(size)]
+
+
+def make_translator(dir_path, args):
+    translator = FakeTranslator(
+        'xx',
+        dir_path=dir_path,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_batch_size=args.batch_size,
+        seed=0,
+    )
+    translator.show_progress = False
+    translator.retry_backoff = 0.01
+    return translator
+
+
+def timed(f, *args, **kwargs):
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def benchmark(size, args):
+    sentences = make_sentences(size)
+    results = {'size': size}
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        translator = make_translator(dir_path, args).load()
+
+        original_create_translations = translator.create_translations
+        create_time = 0
+
+        def create_translations(*f_args, **f_kwargs):
+            nonlocal create_time
+            duration, result = timed(original_create_translations, *f_args, **f_kwargs)
+            create_time += duration
+            return result
+
+        translator.create_translations = create_translations
+        duration, translations = timed(translator.translate, sentences, workers=args.workers)
+        results['translated'] = len(translations)
+        results['translate/s'] = size / duration
+        results['create_translations [us]'] = create_time / size * 1e6
+
+        duration, _ = timed(translator.translate, sentences)
+        results['cache hit [us]'] = duration / size * 1e6
+
+        results['save [ms]'] = timed(translator.save)[0] * 1e3
+        results['load [ms]'] = timed(make_translator(dir_path, args).load)[0] * 1e3
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        translator = make_translator(dir_path, args)
+        duration, _ = timed(lambda: [translator.log_translation(sentence, sentence) for sentence in sentences])
+        results['log_translation [us]'] = duration / size * 1e6
+        duration, _ = timed(lambda: [translator.cache.append(sentence, sentence) for sentence in sentences])
+        results['cache.append [us]'] = duration / size * 1e6
+
+    if args.memory:
+        with tempfile.TemporaryDirectory() as dir_path:
+            translator = make_translator(dir_path, args).load()
+            tracemalloc.start()
+            translator.translate(sentences, workers=args.workers)
+            results['peak memory [MB]'] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+    return results
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    widths = [max(len(column), 12) for column in columns]
+    print(' | '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print(' | '.join(
+            (f'{row[column]:.2f}' if isinstance(row[column], float) else str(row[column])).rjust(width)
+            for column, width in zip(columns, widths)
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--batch-size', type=int, default=1, help='Maximum number of texts per request')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip the (slow) peak memory measurement')
+    args = parser.parse_args()
+
+    logging.getLogger('translators').setLevel(logging.ERROR)
+    print_table([benchmark(size, args) for size in args.sizes])
@@ -0,0 +1,295 @@
+"""
+Corpus-wide evaluation of the heuristics.
+
+`TokenTable` flattens the first sentences of the parses of many translations into numpy columns with one row per
+token. The rules from `gender_heuristics.rules` are evaluated for all the translations at once with array operations
+over the table, other heuristics are called sentence by sentence. Labels are coded as `int8`: 0 for None, 1 for male
+and 2 for female (see `LABELS`), -1 marks missing predictions.
+
+    tables = {
+        (translator_class, language): TokenTable.from_parses(parser.dict, translations[translator_class, language])
+        ...
+    }
+    labels = predict(pl_heuristics, tables[GoogleTranslate, 'pl'])
+    matrix, systems, languages = prediction_matrix({
+        (translator_class, language): (heuristics_map[language], translations[translator_class, language], table)
+        for (translator_class, language), table in tables.items()
+    })
+
+Building the tables is the expensive part, keep them around when the heuristics are tweaked and re-evaluated.
+"""
+import numpy as np
+
+from gender_heuristics.rules import (
+    AdverbPair, ExpandedVerb, GenderedChild, GenderedExpandedHead, GenderedHead, GenderedPair, GenderPairWithTarget,
+)
+from gender_heuristics.tokens import Sentence
+
+
+LABELS = (None, 'male', 'female')
+CODES = {label: code for code, label in enumerate(LABELS)}
+MISSING = -1
+
+# Codes of ids and heads that are not integers
+NO_ID = -2
+OTHER_ID = -3
+
+
+def _code_id(value):
+    if value is None:
+        return NO_ID
+    return value if isinstance(value, int) else OTHER_ID
+
+
+class TokenTable:
+    """
+    Columns of the tokens of `sentences` (compact `Sentence`s of `texts`). Each column has one value per token, `row`
+    holds the index of the text the token belongs to. Words are coded with `vocabulary` and `upos` with `upos_codes`.
+    Columns with the `expanded_` prefix describe the words of multiword tokens.
+    """
+
+    def __init__(self, texts, sentences):
+        self.texts = list(texts)
+        self.sentences = list(sentences)
+        self.text_index = {text: i for i, text in enumerate(self.texts)}
+        self.vocabulary = {}
+        self.upos_codes = {}
+
+        columns = {
+            'row': [], 'lower': [], 'id': [], 'head': [], 'upos': [], 'gender': [], 'has_gender': [],
+            'multiword': [], 'expanded_gender': [], 'expanded_has_gender': [], 'expanded_first_person': [],
+            'expanded_head': [],
+        }
+
+        for row, sentence in enumerate(self.sentences):
+            for token in sentence:
+                columns['row'].append(row)
+                columns['lower'].append(self.vocabulary.setdefault(token.lower, len(self.vocabulary)) if token.text is not None else -1)
+                columns['id'].append(_code_id(token.id))
+                columns['head'].append(_code_id(token.head))
+                columns['upos'].append(self.upos_codes.setdefault(token.upos, len(self.upos_codes)))
+                columns['gender'].append(CODES[token.gender])
+                columns['has_gender'].append(token.has_gender)
+
+                expanded = token.expanded
+                columns['multiword'].append(bool(expanded))
+                columns['expanded_gender'].append(CODES[expanded[0].gender] if expanded else 0)
+                columns['expanded_has_gender'].append(bool(expanded) and expanded[0].has_gender)
+                columns['expanded_first_person'].append(bool(expanded) and expanded[-1].person == '1')
+                columns['expanded_head'].append(_code_id(expanded[0].head) if expanded else NO_ID)
+
+        dtypes = {
+            'row': np.int32, 'lower': np.int32, 'id': np.int64, 'head': np.int64, 'upos': np.int16,
+            'gender': np.int8, 'expanded_gender': np.int8, 'expanded_head': np.int64,
+        }
+        for name, values in columns.items():
+            setattr(self, name, np.array(values, dtype=dtypes.get(name, bool)))
+
+        # Lookup of the first token with a given id in a row, keyed by `row * id_base + id`
+        self.id_base = int(max(self.id.max(initial=0), self.head.max(initial=0), self.expanded_head.max(initial=0))) + 1
+        valid = np.flatnonzero(self.id >= 0)
+        self.id_keys, first = np.unique(self.row[valid] * self.id_base + self.id[valid], return_index=True)
+        self.id_rows = valid[first]
+
+
+    @classmethod
+    def from_parses(cls, parses, texts):
+        """
+        Create a table of the unique `texts` and their parses in `parses` (e.g., `Parser.dict`).
+        """
+        texts = list(dict.fromkeys(texts))
+        return cls(texts, (Sentence.from_parse(parses[text]) for text in texts))
+
+
+    def __len__(self):
+        return len(self.texts)
+
+
+    def word(self, lower):
+        """
+        Return the mask of tokens with the lowercased text `lower`.
+        """
+        if lower not in self.vocabulary:
+            return np.zeros(len(self.row), dtype=bool)
+        return self.lower == self.vocabulary[lower]
+
+
+    def upos_in(self, upos):
+        codes = [self.upos_codes[value] for value in upos if value in self.upos_codes]
+        return np.isin(self.upos, codes)
+
+
+    def first(self, mask):
+        """
+        Return the index of the first token in `mask` for each text, -1 if there is none.
+        """
+        tokens = np.flatnonzero(mask)
+        first = np.full(len(self), -1, dtype=np.int64)
+        rows, idx = np.unique(self.row[tokens], return_index=True)
+        first[rows] = tokens[idx]
+        return first
+
+
+    def lookup(self, rows, ids):
+        """
+        Return the indices of the first tokens with `ids` in `rows`, -1 if there is none.
+        """
+        if not len(self.id_keys):
+            return np.full(len(ids), -1, dtype=np.int64)
+        keys = rows * self.id_base + ids
+        position = np.searchsorted(self.id_keys, keys).clip(max=len(self.id_keys) - 1)
+        found = (ids >= 0) & (self.id_keys[position] == keys)
+        return np.where(found, self.id_rows[position], -1)
+
+
+    def take(self, column, index, default=0):
+        """
+        Return the values of `column` for token indices `index`, `default` where the index is -1.
+        """
+        if not len(column):
+            return np.full(len(index), default, dtype=column.dtype)
+        return np.where(index >= 0, column[index], default)
+
+
+def _labels_of_first(table, mask, labels):
+    """
+    For each text, return the label of its first token in `mask`, 0 if there is none.
+    """
+    return table.take(labels, table.first(mask))
+
+
+def _gendered_head(table, rule):
+    targets = np.flatnonzero(table.word(rule.target_word))
+    heads = table.lookup(table.row[targets], table.head[targets])
+    hit = np.zeros(len(table.row), dtype=bool)
+    hit[targets] = table.take(table.upos_in(rule.upos), heads, False) & (table.take(table.gender, heads) != 0)
+    gender = np.zeros(len(table.row), dtype=np.int8)
+    gender[targets] = table.take(table.gender, heads)
+    return _labels_of_first(table, hit, gender)
+
+
+def _gendered_pair(table, rule):
+    male, female = rule.pair
+    labels = np.zeros(len(table), dtype=np.int8)
+    labels[table.row[table.word(male)]] = CODES['male']
+    labels[table.row[table.word(female)]] = CODES['female']
+    return labels
+
+
+def _same_head_as(table, first, target):
+    """
+    True for the texts whose `first` token exists and has the same head as the `target` token.
+    """
+    head = table.take(table.head, first, NO_ID)
+    return (target >= 0) & (head != NO_ID) & (head == table.take(table.head, target, NO_ID))
+
+
+def _gender_pair_with_target(table, rule):
+    male, female = rule.pair
+    target = table.first(table.word(rule.target_word))
+    is_male = _same_head_as(table, table.first(table.word(male)), target)
+    is_female = _same_head_as(table, table.first(table.word(female)), target)
+
+    labels = np.zeros(len(table), dtype=np.int8)
+    for mask, gender in ((is_female, 'female'), (is_male, 'male')) if rule.male_first else ((is_male, 'male'), (is_female, 'female')):
+        labels[mask] = CODES[gender]
+    return labels
+
+
+def _adverb_pair(table, rule):
+    male, female = rule.pair
+    first_male = table.first(table.word(male))
+    is_male = table.take(table.upos_in(('ADV',)), first_male, False)
+
+    labels = np.zeros(len(table), dtype=np.int8)
+    labels[is_male] = CODES['male']
+    labels[table.row[table.word(female)]] = CODES['female']
+    return labels
+
+
+def _expanded_verb(table, rule):
+    return _labels_of_first(table, table.multiword & table.expanded_first_person & table.expanded_has_gender, table.expanded_gender)
+
+
+def _gendered_expanded_head(table, rule):
+    targets = np.flatnonzero(table.word(rule.target_word) & table.multiword)
+    heads = table.lookup(table.row[targets], table.expanded_head[targets])
+    hit = np.zeros(len(table.row), dtype=bool)
+    gender = np.zeros(len(table.row), dtype=np.int8)
+    gender[targets] = table.take(table.gender, heads)
+    hit[targets] = gender[targets] != 0
+    return _labels_of_first(table, hit, gender)
+
+
+def _gendered_child(table, rule):
+    target = table.first(table.word(rule.target_word))
+    target_id = table.take(table.id, target, OTHER_ID)[table.row]
+    has_target = (target >= 0)[table.row]
+    mask = has_target & (table.head == target_id) & table.upos_in(rule.upos) & (table.gender != 0)
+    return _labels_of_first(table, mask, table.gender)
+
+
+VECTORIZED = {
+    GenderedHead: _gendered_head,
+    GenderedPair: _gendered_pair,
+    GenderPairWithTarget: _gender_pair_with_target,
+    AdverbPair: _adverb_pair,
+    ExpandedVerb: _expanded_verb,
+    GenderedExpandedHead: _gendered_expanded_head,
+    GenderedChild: _gendered_child,
+}
+
+
+def evaluate(heuristics, table):
+    """
+    Return an `int8` array with the labels of all the `heuristics` (columns) for all the texts of `table` (rows). Rules
+    listed in `VECTORIZED` are evaluated with array operations, other heuristics are called for each sentence.
+    """
+    results = np.zeros((len(table), len(heuristics)), dtype=np.int8)
+    for column, heuristic in enumerate(heuristics):
+        if (f := VECTORIZED.get(type(heuristic))) is not None:
+            results[:, column] = f(table, heuristic)
+        else:
+            match = getattr(heuristic, 'match', heuristic)
+            results[:, column] = [CODES[match(text, sentence)] for text, sentence in zip(table.texts, table.sentences)]
+    return results
+
+
+def first_labels(results):
+    """
+    Reduce `evaluate` results to the first male or female label of each row, as `run_heuristics_wrapper` does.
+    """
+    decided = results != 0
+    return np.where(decided.any(axis=1), results[np.arange(len(results)), decided.argmax(axis=1)], 0).astype(np.int8)
+
+
+def predict(heuristics, table, texts=None, lazy=True):
+    """
+    Return the labels for `texts` (all the texts of `table` by default). With `lazy`, a single label per text is
+    returned, otherwise the labels of all the heuristics.
+    """
+    results = evaluate(heuristics, table)
+    if lazy:
+        results = first_labels(results)
+    if texts is not None:
+        results = results[[table.text_index[text] for text in texts]]
+    return results
+
+
+def prediction_matrix(workload):
+    """
+    Evaluate `workload` (`{(system, language): (heuristics, translations, table)}`), where `translations` are the
+    translations of the same source sentences for all the pairs and `table` is a `TokenTable` with their parses.
+    Returns `(labels, systems, languages)`, `labels` has shape `(sentences, systems, languages)` and `MISSING` for the
+    pairs that are not in `workload`.
+    """
+    systems = list(dict.fromkeys(system for system, _ in workload))
+    languages = list(dict.fromkeys(language for _, language in workload))
+    sentence_counts = {len(translations) for _, translations, _ in workload.values()}
+    if len(sentence_counts) > 1:
+        raise ValueError(f'All the pairs need the same number of translations, got {sorted(sentence_counts)}')
+
+    labels = np.full((sentence_counts.pop() if sentence_counts else 0, len(systems), len(languages)), MISSING, dtype=np.int8)
+    for (system, language), (heuristics, translations, table) in workload.items():
+        labels[:, systems.index(system), languages.index(language)] = predict(heuristics, table, translations)
+    return labels, systems, languages
@@ -1,89 +1,92 @@
-def run_heuristics_wrapper(heuristics, lazy=True):
+from gender_heuristics.rules import (
+    AdverbPair, CompiledRules, ExpandedVerb, Function, GenderedChild, GenderedExpandedHead, GenderedHead, GenderedPair,
+    GenderPairWithTarget, Rule, compile_rules,
+)
+from gender_heuristics.tokens import Token, compact, feature, same_head, GENDERS
+
+# The language modules (`l_*.py`) use `from gender_heuristics.heuristics import *`, the rules and the token helpers are
+# re-exported for them
+__all__ = [
+    'AdverbPair', 'CompiledRules', 'ExpandedVerb', 'Function', 'GenderedChild', 'GenderedExpandedHead', 'GenderedHead',
+    'GenderedPair', 'GenderPairWithTarget', 'Rule', 'compile_rules',
+    'Token', 'compact', 'feature', 'same_head', 'GENDERS',
+    'run_heuristics_wrapper', 'token_by_attribute', 'token_gender',
+    'heuristic_gendered_head', 'heuristic_gendered_pair', 'heuristic_gender_pair_with_target',
+]
+
+
+def run_heuristics_wrapper(heuristics, lazy=True, profiler=None):
     """
     Helper function to put together language-specific heuristics
+
+    `tokens` can be either a list of trankit token dicts or a compact `Sentence`. The heuristics are compiled with
+    `compile_rules`, so the tokens are converted and indexed only once per call. It is better to pass `Sentence`s when
+    the same parse is evaluated repeatedly.
+
+    `profiler` is an optional `HeuristicProfile` that records the statistics of the individual heuristics.
     """
+    rules = compile_rules(heuristics)
+
+    if profiler is not None:
+        return profiler.wrap(rules, lazy)
+
     if lazy:
         """
         Return first male or female gender
         """
-        def heuristic_f(translation, tokens):
-            for h in heuristics:
-                if (gender := h(translation, tokens)) is not None:
-                    return gender
+        return rules.first
 
     else:
         """
         Return all results
         """
-        def heuristic_f(translation, tokens):
-            return [h(translation, tokens) for h in heuristics]
-
-    return heuristic_f
+        return rules
 
 
 def token_by_attribute(tokens, attribute, value, lower=False):
     """
     Return a token from `tokens` that has the `attribute` with the given `value`
     Helper function to work with the tokens.
+
+    Lookups of lowercased texts and of ids use the sentence indices, other lookups scan the tokens.
     """
+    tokens = compact(tokens)
+
+    if attribute == 'text' and lower:
+        return tokens.first(value)
+
+    if attribute == 'id' and not lower:
+        return tokens.by_id.get(value)
+
     for token in tokens:
-        if attribute in token:
+        token_value = getattr(token, attribute, None)
+        if token_value is not None:
 
             if lower:
-                if token[attribute].lower() == value:
+                if token_value.lower() == value:
                     return token
 
             else:
-                if token[attribute] == value:
+                if token_value == value:
                     return token
 
 
 def token_gender(token):
-    if 'Gender=' in token.get('feats', ''):
-        gender_idx = token['feats'].index('Gender=')
-        gender = token['feats'][gender_idx+7: gender_idx+10]  # extract Fem, Mas or Neu as gender
-        return {'Mas': 'male', 'Fem': 'female', 'Neu': None}[gender]
-        
-    
+    if isinstance(token, Token):
+        return token.gender
+    return GENDERS.get(feature(token.get('feats', ''), 'Gender', 3))
+
 
 def heuristic_gendered_head(translation, tokens, target_word):
     """
     Find the tokens that has the same value as `target_word` and check their heads. If any of the heads are gendered, return that gender.
     """
-
-    for token in tokens:
-        if token['text'].lower() == target_word:
-            head_token = token_by_attribute(tokens, attribute='id', value=token['head'])
-            if head_token and head_token['upos'] in ('VERB', 'AUX', 'ADJ', 'DET') and (gender := token_gender(head_token)):
-                    return gender
-
+    return GenderedHead(target_word)(translation, tokens)
 
 
 def heuristic_gendered_pair(translation, tokens, pair):
-
-    male, female = pair
-
-    if any(token.get('text', '').lower() == female for token in tokens):
-        return 'female'
-        
-    if any(token.get('text', '').lower() == male for token in tokens):
-        return 'male'
+    return GenderedPair(pair)(translation, tokens)
 
 
 def heuristic_gender_pair_with_target(translation, tokens, target_word, pair):
-    male, female = pair
-    
-    target_token = token_by_attribute(tokens, 'text', target_word, lower=True)
-    if target_token is None:
-        return None
-
-    female_token = token_by_attribute(tokens, 'text', female, lower=True)
-    if female_token and female_token['head'] == target_token['head']:
-        return 'female'
-
-    male_token = token_by_attribute(tokens, 'text', male, lower=True)
-    if male_token and male_token['head'] == target_token['head']:
-        return 'male'
-
-
-
+    return GenderPairWithTarget(target_word, pair)(translation, tokens)
@@ -1,24 +1,11 @@
 from gender_heuristics.heuristics import *
 
 
-heuristic_ia = lambda translation, tokens: heuristic_gendered_head(translation, tokens, 'я')
-heuristic_sam_sama = lambda translation, tokens: heuristic_gendered_pair(translation, tokens, ('сам', 'сама'))
+heuristic_ia = GenderedHead('я')
+heuristic_sam_sama = GenderedPair(('сам', 'сама'))
 
-def heuristic_ia_byu_byla(translation, tokens):
-    """
-    I think this is an incorrect parsing, but sometimes я (ia) and быў/была (byu/byla) have a common head.
-    """
-    ia_token = token_by_attribute(tokens, 'text', 'я', lower=True)
-
-    if ia_token:
-
-        byu_token = token_by_attribute(tokens, 'text', 'быў', lower=True)
-        if byu_token and byu_token['head'] == ia_token['head']:
-            return 'male'
-
-        byla_token = token_by_attribute(tokens, 'text', 'была', lower=True)
-        if byla_token and byla_token['head'] == ia_token['head']:
-            return 'female'    
+# I think this is an incorrect parsing, but sometimes я (ia) and быў/была have a common head.
+heuristic_ia_byu_byla = GenderPairWithTarget('я', ('быў', 'была'), male_first=True)
 
 
 def heuristic_ia_wrong(translation, tokens):
@@ -29,9 +16,9 @@ def heuristic_ia_wrong(translation, tokens):
     if 'я ' not in translation.lower():
         return None
 
-    for token in tokens:
-        if token.get('text', '').lower().startswith('я '):
-            if (gender := token_gender(token)) is not None:
+    for token in compact(tokens):
+        if token.lower.startswith('я '):
+            if (gender := token.gender) is not None:
                 return gender
 
 
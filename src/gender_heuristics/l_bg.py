@@ -1,8 +1,8 @@
 from gender_heuristics.heuristics import *
 
 
-heuristic_sam = lambda translation, tokens: heuristic_gendered_head(translation, tokens, 'съм')
-heuristic_bikh = lambda translation, tokens: heuristic_gendered_head(translation, tokens, 'бих')
+heuristic_sam = GenderedHead('съм')
+heuristic_bikh = GenderedHead('бих')
 
 
 bg_heuristics = [heuristic_sam, heuristic_bikh]
\ No newline at end of file
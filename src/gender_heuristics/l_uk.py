@@ -1,25 +1,12 @@
 from gender_heuristics.heuristics import *
 
 
-heuristic_ia = lambda translation, tokens: heuristic_gendered_head(translation, tokens, 'я')
-heuristic_buv_bula = lambda translation, tokens: heuristic_gendered_pair(translation, tokens, ('був', 'була'))
-heuristic_odin_odna = lambda translation, tokens: heuristic_gendered_pair(translation, tokens, ('один', 'одна'))
+heuristic_ia = GenderedHead('я')
+heuristic_buv_bula = GenderedPair(('був', 'була'))
+heuristic_odin_odna = GenderedPair(('один', 'одна'))
 
-def heuristic_ia_buv_bula(translation, tokens):
-    """
-    I think this is an incorrect parsing, but sometimes я (ia) and быў/была (byu/byla) have a common head.
-    """
-    ia_token = token_by_attribute(tokens, 'text', 'я', lower=True)
-
-    if ia_token:
-
-        byu_token = token_by_attribute(tokens, 'text', 'був', lower=True)
-        if byu_token and byu_token['head'] == ia_token['head']:
-            return 'male'
-
-        byla_token = token_by_attribute(tokens, 'text', 'була', lower=True)
-        if byla_token and byla_token['head'] == ia_token['head']:
-            return 'female'    
+# I think this is an incorrect parsing, but sometimes я (ia) and був/була have a common head.
+heuristic_ia_buv_bula = GenderPairWithTarget('я', ('був', 'була'), male_first=True)
 
 
 uk_heuristics = [heuristic_ia, heuristic_ia_buv_bula, heuristic_odin_odna]
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Persistent cache of the heuristic predictions.
+"""
+import hashlib
+import inspect
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from gender_heuristics import batch, tokens
+from gender_heuristics.batch import LABELS, TokenTable, evaluate, first_labels
+from gender_heuristics.rules import Function, Rule
+
+
+def heuristic_fingerprint(heuristic):
+    """
+    Describe `heuristic` by its parameters and by the source code that evaluates it, so that editing either of them
+    changes the fingerprint.
+    """
+    if isinstance(heuristic, Function):
+        heuristic = heuristic.f
+    if isinstance(heuristic, Rule):
+        code = type(heuristic).match
+        description = repr(heuristic)
+    else:
+        code = heuristic
+        description = getattr(heuristic, '__qualname__', repr(heuristic))
+    try:
+        source = inspect.getsource(code)
+    except (OSError, TypeError):
+        source = ''
+    return f'{description}\n{source}'
+
+
+def rule_set_fingerprint(heuristics):
+    """
+    Fingerprint of an ordered list of heuristics (e.g., `pl_heuristics`) and of the source code of the modules that
+    index the parses and evaluate the heuristics on them.
+    """
+    sources = [inspect.getsource(module) for module in (tokens, batch)]
+    return hashlib.sha1('\0'.join(sources + list(map(heuristic_fingerprint, heuristics))).encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """
+    Predictions of the heuristics stored in a SQLite database. The labels of all the heuristics of a list are stored
+    for each (language, rule-set fingerprint, translation, parser fingerprint), so only the translations that are new,
+    or were parsed by a different parser, or are evaluated with a changed heuristic list are recomputed.
+
+    Each rule set is recorded with the time it was last used, `flipped` compares the predictions of the two most
+    recently used rule sets of a language to show what a change of the heuristics did (also when the change is reverted).
+
+        cache = PredictionCache()
+        labels = cache.predict(pl_heuristics, translations, Parser('pl'))
+    """
+
+    def __init__(self, path=os.path.join('cache', 'predictions.sqlite')):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS predictions (
+                    language TEXT NOT NULL,
+                    rule_set TEXT NOT NULL,
+                    parser TEXT NOT NULL,
+                    digest BLOB NOT NULL,
+                    translation TEXT NOT NULL,
+                    labels BLOB NOT NULL,
+                    PRIMARY KEY (language, rule_set, parser, digest)
+                )
+            ''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS rule_sets (
+                    language TEXT NOT NULL,
+                    rule_set TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (language, rule_set)
+                )
+            ''')
+            # Databases created before `last_used` was added
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(rule_sets)')]
+            if 'last_used' not in columns:
+                self.connection.execute('ALTER TABLE rule_sets ADD COLUMN last_used REAL NOT NULL DEFAULT 0')
+                self.connection.execute('UPDATE rule_sets SET last_used = created')
+
+
+    @staticmethod
+    def digest(text):
+        return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+    def predict(self, heuristics, translations, parser, lazy=True):
+        """
+        Return the labels of `heuristics` for `translations` parsed by `parser` (a `Parser`), as `batch.predict` does.
+        Only the predictions missing from the cache are computed.
+        """
+        language, rule_set = parser.language, rule_set_fingerprint(heuristics)
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO rule_sets VALUES (?, ?, ?, ?) ON CONFLICT (language, rule_set) DO UPDATE SET last_used = excluded.last_used',
+                (language, rule_set, now, now),
+            )
+
+        labels = {}
+        for translation in dict.fromkeys(translations):
+            row = self.connection.execute(
+                'SELECT labels FROM predictions WHERE language = ? AND rule_set = ? AND parser = ? AND digest = ?',
+                (language, rule_set, parser.fingerprint, self.digest(translation)),
+            ).fetchone()
+            if row is not None:
+                labels[translation] = np.frombuffer(row[0], dtype=np.int8)
+
+        missing = [translation for translation in dict.fromkeys(translations) if translation not in labels]
+        if missing:
+            table = TokenTable.from_parses(parser.dict, missing)
+            results = evaluate(heuristics, table)
+            labels.update(zip(table.texts, results))
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        (language, rule_set, parser.fingerprint, self.digest(translation), translation, result.tobytes())
+                        for translation, result in zip(table.texts, results)
+                    ),
+                )
+
+        results = np.array([labels[translation] for translation in translations], dtype=np.int8).reshape(len(translations), len(heuristics))
+        return first_labels(results) if lazy else results
+
+
+    def rule_sets(self, language):
+        """
+        Return the fingerprints of the rule sets used for `language`, from the least recently used.
+        """
+        return [
+            rule_set
+            for rule_set, in self.connection.execute('SELECT rule_set FROM rule_sets WHERE language = ? ORDER BY last_used', (language,))
+        ]
+
+
+    def flipped(self, language, old=None, new=None):
+        """
+        Return `(translation, old label, new label)` for the translations whose (lazy) prediction differs between the
+        `old` and `new` rule sets (fingerprints or heuristic lists). By default, the two most recently used rule sets of
+        `language` are compared. Only translations predicted with both rule sets and the same parser are compared.
+        """
+        rule_sets = self.rule_sets(language)
+        old = rule_set_fingerprint(old) if isinstance(old, list) else old or (rule_sets[-2] if len(rule_sets) > 1 else None)
+        new = rule_set_fingerprint(new) if isinstance(new, list) else new or (rule_sets[-1] if rule_sets else None)
+        if old is None or new is None:
+            return []
+
+        rows = self.connection.execute('''
+            SELECT old.translation, old.labels, new.labels
+            FROM predictions AS old JOIN predictions AS new
+                ON old.language = new.language AND old.parser = new.parser AND old.digest = new.digest
+            WHERE old.language = ? AND old.rule_set = ? AND new.rule_set = ?
+        ''', (language, old, new))
+
+        flips = []
+        for translation, old_labels, new_labels in rows:
+            old_label, new_label = (
+                first_labels(np.frombuffer(blob, dtype=np.int8).reshape(1, -1))[0]
+                for blob in (old_labels, new_labels)
+            )
+            if old_label != new_label:
+                flips.append((translation, LABELS[old_label], LABELS[new_label]))
+        return flips
+
+
+    def invalidate(self, language, rule_set=None):
+        """
+        Delete the predictions for `language`, only those of `rule_set` (fingerprint or heuristic list) if given.
+        Returns the number of deleted predictions.
+        """
+        if isinstance(rule_set, list):
+            rule_set = rule_set_fingerprint(rule_set)
+        with self.connection:
+            if rule_set is None:
+                self.connection.execute('DELETE FROM rule_sets WHERE language = ?', (language,))
+                return self.connection.execute('DELETE FROM predictions WHERE language = ?', (language,)).rowcount
+            self.connection.execute('DELETE FROM rule_sets WHERE language = ? AND rule_set = ?', (language, rule_set))
+            return self.connection.execute(
+                'DELETE FROM predictions WHERE language = ? AND rule_set = ?', (language, rule_set),
+            ).rowcount
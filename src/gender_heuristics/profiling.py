@@ -0,0 +1,138 @@
+"""
+Opt-in profiling of the heuristics run by `run_heuristics_wrapper`.
+"""
+import importlib
+from time import perf_counter
+
+from gender_heuristics.rules import Function
+from gender_heuristics.tokens import compact
+
+
+def heuristic_names(heuristics, language=None):
+    """
+    Return the names of `heuristics`: the `heuristic_*` variable names from `gender_heuristics.l_<language>`, the
+    function names, or `repr`s for the rest (e.g., lambdas).
+    """
+    variables = {}
+    if language is not None:
+        try:
+            module = importlib.import_module(f'gender_heuristics.l_{language.replace("-", "_")}')
+            variables = {id(value): name for name, value in vars(module).items() if name.startswith('heuristic_')}
+        except ImportError:
+            pass
+
+    names = []
+    for heuristic in heuristics:
+        function = heuristic.f if isinstance(heuristic, Function) else heuristic
+        name = variables.get(id(heuristic)) or variables.get(id(function)) or getattr(function, '__name__', None)
+        names.append(name if name and name != '<lambda>' else repr(function))
+    return names
+
+
+def new_stats():
+    return {'calls': 0, 'male': 0, 'female': 0, 'None': 0, 'decided': 0, 'seconds': 0.0}
+
+
+class HeuristicProfile:
+    """
+    Statistics of the heuristics of one `language`, collected by passing the profile to `run_heuristics_wrapper`:
+
+        profile = HeuristicProfile('pl')
+        h = run_heuristics_wrapper(pl_heuristics, lazy=True, profiler=profile)
+        ...
+        profile.dataframe()
+
+    For each heuristic it counts the calls, the male, female and None results and the time spent. `decided` counts the
+    sentences where the heuristic gave the first male or female result, i.e., the result of the lazy mode. In the lazy
+    mode the heuristics after the deciding one are not called. The `(index)` row is the time spent converting and indexing the tokens.
+
+    The statistics are kept by the position of the heuristic in the list, so heuristics with the same name are counted
+    separately. The names are the `names` given, or the ones found by `heuristic_names`.
+
+    The profiled heuristics are evaluated one by one, so the measured time includes the profiling overhead.
+    """
+
+    def __init__(self, language=None, names=None):
+        self.language = language
+        self.names = names
+        self.index_stats = new_stats()
+        self.stats = []
+
+
+    def wrap(self, rules, lazy=True):
+        """
+        Return a heuristic function that evaluates `CompiledRules` `rules` and records the statistics.
+        """
+        if self.names is None:
+            self.names = heuristic_names(rules.rules, self.language)
+        if len(self.names) != len(rules.rules):
+            raise ValueError(f'{len(self.names)} names were given for {len(rules.rules)} heuristics')
+        if not self.stats:
+            self.stats = [new_stats() for _ in rules.rules]
+        index_stats = self.index_stats
+        rule_stats = self.stats
+
+        def heuristic_f(translation, tokens):
+            start = perf_counter()
+            sentence = compact(tokens).index()
+            index_stats['calls'] += 1
+            index_stats['seconds'] += perf_counter() - start
+
+            results = []
+            decided = False
+            for rule, stats in zip(rules.rules, rule_stats):
+                start = perf_counter()
+                gender = rule.match(translation, sentence)
+                stats['seconds'] += perf_counter() - start
+                stats['calls'] += 1
+                stats[str(gender)] += 1
+
+                if gender is not None and not decided:
+                    stats['decided'] += 1
+                    decided = True
+                    if lazy:
+                        return gender
+                results.append(gender)
+
+            if not lazy:
+                return results
+
+        return heuristic_f
+
+
+    def rows(self):
+        """
+        Return the statistics as a list of dicts, one per heuristic.
+        """
+        entries = [(None, '(index)', self.index_stats)]
+        entries += [(position, name, stats) for position, (name, stats) in enumerate(zip(self.names or [], self.stats))]
+        return [
+            {
+                'language': self.language,
+                'position': position,
+                'heuristic': name,
+                **{key: value for key, value in stats.items() if key != 'seconds'},
+                'hits': stats['male'] + stats['female'],
+                'time [ms]': stats['seconds'] * 1e3,
+                'time per call [us]': stats['seconds'] / stats['calls'] * 1e6 if stats['calls'] else 0.0,
+            }
+            for position, name, stats in entries
+        ]
+
+
+    def dataframe(self):
+        return profile_dataframe(self)
+
+
+    def reset(self):
+        for stats in [self.index_stats, *self.stats]:
+            stats.update({key: 0 for key in stats})
+
+
+def profile_dataframe(*profiles):
+    """
+    Return a `pandas.DataFrame` with the statistics of `profiles`, one row per language and heuristic.
+    """
+    import pandas as pd
+
+    return pd.DataFrame([row for profile in profiles for row in profile.rows()])
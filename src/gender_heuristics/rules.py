@@ -0,0 +1,205 @@
+"""
+Declarative form of the language heuristics.
+
+A rule is a callable with the same signature as the heuristic functions, `rule(translation, tokens)`, that returns
+`'male'`, `'female'` or None. Rules only look up the `Sentence` indices, so `compile_rules` can evaluate a whole list
+of rules with a single pass over the tokens of a sentence. Other callables in the list are wrapped in `Function` and
+called as they are.
+"""
+from gender_heuristics.tokens import compact, same_head
+
+
+class Rule:
+    """
+    Subclasses implement `match(translation, sentence)` for compacted sentences.
+    """
+
+    def __call__(self, translation, tokens):
+        return self.match(translation, compact(tokens))
+
+
+    def match(self, translation, sentence):
+        raise NotImplementedError
+
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{value!r}" for value in vars(self).values())})'
+
+
+class GenderedHead(Rule):
+    """
+    Find the tokens with the text `target_word` and check their heads. If any of the heads is a gendered `upos`,
+    return its gender.
+    """
+
+    def __init__(self, target_word, upos=('VERB', 'AUX', 'ADJ', 'DET')):
+        self.target_word = target_word
+        self.upos = upos
+
+
+    def match(self, translation, sentence):
+        for token in sentence.by_lower.get(self.target_word, ()):
+            head_token = sentence.by_id.get(token.head)
+            if head_token and head_token.upos in self.upos and (gender := head_token.gender):
+                return gender
+
+
+class GenderedPair(Rule):
+    """
+    Return the gender of the word from the (male, female) `pair` that is in the sentence. Female wins if both are.
+    """
+
+    def __init__(self, pair):
+        self.pair = pair
+
+
+    def match(self, translation, sentence):
+        male, female = self.pair
+
+        if female in sentence.by_lower:
+            return 'female'
+
+        if male in sentence.by_lower:
+            return 'male'
+
+
+class GenderPairWithTarget(Rule):
+    """
+    Return the gender of the word from the (male, female) `pair` that has the same head as `target_word`. Female is
+    checked first, unless `male_first`.
+    """
+
+    def __init__(self, target_word, pair, male_first=False):
+        self.target_word = target_word
+        self.pair = pair
+        self.male_first = male_first
+
+
+    def match(self, translation, sentence):
+        target_token = sentence.first(self.target_word)
+        if target_token is None:
+            return None
+
+        male, female = self.pair
+        candidates = ((male, 'male'), (female, 'female'))
+        if not self.male_first:
+            candidates = reversed(candidates)
+
+        for word, gender in candidates:
+            token = sentence.first(word)
+            if token and same_head(token, target_token):
+                return gender
+
+
+class AdverbPair(Rule):
+    """
+    Like `GenderedPair`, but the male word has to be an adverb, e.g., for `sam` that also means `did`.
+    """
+
+    def __init__(self, pair):
+        self.pair = pair
+
+
+    def match(self, translation, sentence):
+        male, female = self.pair
+
+        if sentence.first(female):
+            return 'female'
+
+        if (token := sentence.first(male)) and token.upos == 'ADV':
+            return 'male'
+
+
+class ExpandedVerb(Rule):
+    """
+    Verbs with a special expanded form in the parse tree (e.g., Polish). Return the gender of the first expanded word
+    if the last one is in the first person.
+    """
+
+    def match(self, translation, sentence):
+        for token in sentence.multiword:
+            verb_tokens = token.expanded
+            if verb_tokens[-1].person == '1' and verb_tokens[0].has_gender:
+                return verb_tokens[0].gender
+
+
+class GenderedExpandedHead(Rule):
+    """
+    Similar to `GenderedHead`, but for multiword tokens with `target_word` text, the head of their first expanded word
+    is checked.
+    """
+
+    def __init__(self, target_word):
+        self.target_word = target_word
+
+
+    def match(self, translation, sentence):
+        for token in sentence.by_lower.get(self.target_word, ()):
+            if token.expanded:
+                head_token = sentence.by_id.get(token.expanded[0].head)
+                if head_token and (gender := head_token.gender) is not None:
+                    return gender
+
+
+class GenderedChild(Rule):
+    """
+    Return the gender of the first gendered `upos` token that depends on the first `target_word` token.
+    """
+
+    def __init__(self, target_word, upos=('AUX', 'ADJ')):
+        self.target_word = target_word
+        self.upos = upos
+
+
+    def match(self, translation, sentence):
+        target_token = sentence.first(self.target_word)
+        if not target_token:
+            return None
+
+        for token in sentence.children.get(target_token.id, ()):
+            if token.upos in self.upos and (gender := token.gender) is not None:
+                return gender
+
+
+class Function(Rule):
+    """
+    Wrap a heuristic function that is not expressed as a rule. It is called with the original `tokens` or, when it is
+    evaluated by compiled rules, with the `Sentence`.
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+
+    def __call__(self, translation, tokens):
+        return self.f(translation, tokens)
+
+
+    def match(self, translation, sentence):
+        return self.f(translation, sentence)
+
+
+class CompiledRules:
+    """
+    Evaluate `rules` for a sentence after indexing its tokens in a single pass. Calling the object returns the results
+    of all the rules, `first` returns the first male or female result.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rule if isinstance(rule, Rule) else Function(rule) for rule in rules)
+
+
+    def __call__(self, translation, tokens):
+        sentence = compact(tokens).index()
+        return [rule.match(translation, sentence) for rule in self.rules]
+
+
+    def first(self, translation, tokens):
+        sentence = compact(tokens).index()
+        for rule in self.rules:
+            if (gender := rule.match(translation, sentence)) is not None:
+                return gender
+
+
+def compile_rules(rules):
+    return CompiledRules(rules)
@@ -0,0 +1,184 @@
+"""
+Compact representation of the trankit parses used by the heuristics.
+
+trankit tokens are dicts with many keys (spans, lemmas, dependency relations, ...) and string `feats` that would have
+to be searched every time a heuristic needs the gender. `Token` keeps only the fields the heuristics use, in
+`__slots__`, with interned strings and with the gender and person features decoded once. `Sentence` is an immutable
+sequence of `Token`s.
+"""
+from sys import intern
+
+
+GENDERS = {'Mas': 'male', 'Fem': 'female', 'Neu': None}
+
+
+def _intern(value):
+    return intern(value) if isinstance(value, str) else value
+
+
+def feature(feats, name, length):
+    """
+    Return the first `length` characters of the value of feature `name` in `feats` string, e.g.,
+    `feature('Gender=Masc|Person=1', 'Gender', 3) == 'Mas'`. Returns None if the feature is missing.
+    """
+    if feats and (key := name + '=') in feats:
+        idx = feats.index(key) + len(key)
+        return feats[idx: idx + length]
+
+
+class Token:
+    """
+    `has_gender` is True if the token has a `Gender` feature, `gender` is the decoded gender (`'male'`, `'female'` or
+    None for neuter and tokens without gender). `person` is the first character of the `Person` feature. `expanded`
+    is a tuple of words of a multiword token, or None.
+
+    For compatibility with code written for trankit dicts, tokens also support `token['text']`, `token.get('feats')`
+    and `'expanded' in token`.
+    """
+
+    __slots__ = ('id', 'head', 'upos', 'text', 'lower', 'feats', 'has_gender', 'gender', 'person', 'expanded')
+
+    def __init__(self, token):
+        token_id = token.get('id')
+        self.id = tuple(token_id) if isinstance(token_id, list) else token_id
+        self.head = token.get('head')
+        self.upos = _intern(token.get('upos'))
+        self.text = _intern(token.get('text'))
+        self.lower = intern((self.text or '').lower())
+        self.feats = _intern(token.get('feats'))
+
+        gender = feature(self.feats, 'Gender', 3)
+        self.has_gender = gender is not None
+        self.gender = GENDERS.get(gender)
+        self.person = feature(self.feats, 'Person', 1)
+
+        self.expanded = tuple(Token(word) for word in token['expanded']) if 'expanded' in token else None
+
+
+    def __repr__(self):
+        return f'Token(id={self.id!r}, text={self.text!r}, upos={self.upos!r}, head={self.head!r}, feats={self.feats!r})'
+
+
+    def __getitem__(self, key):
+        if key not in self.__slots__ or getattr(self, key) is None:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class Sentence:
+    """
+    Immutable sequence of `Token`s of a single parsed sentence.
+
+    The sentence also has indices that make the lookups of the heuristics constant-time: `by_lower` (lowercased text
+    -> tokens), `by_id` (id -> first token with the id), `children` (head -> tokens) and `multiword` (tokens with
+    `expanded` words). They are built together in a single pass over the tokens on first use. Tokens keep the
+    sentence order in the indices.
+    """
+
+    __slots__ = ('tokens', '_by_lower', '_by_id', '_children', '_multiword')
+
+    def __init__(self, tokens):
+        self.tokens = tuple(token if isinstance(token, Token) else Token(token) for token in tokens)
+        self._by_lower = self._by_id = self._children = self._multiword = None
+
+
+    @classmethod
+    def from_parse(cls, parse, sentence_id=0):
+        """
+        Create a `Sentence` from the `sentence_id`-th sentence of a trankit `parse` (e.g., `Parser.dict[text]`).
+        """
+        return cls(parse['sentences'][sentence_id]['tokens'])
+
+
+    def index(self):
+        """
+        Build the indices, if they are not built yet.
+        """
+        if self._by_lower is None:
+            by_lower, by_id, children, multiword = {}, {}, {}, []
+            for token in self.tokens:
+                if token.text is not None:
+                    by_lower.setdefault(token.lower, []).append(token)
+                if token.id is not None:
+                    by_id.setdefault(token.id, token)
+                children.setdefault(token.head, []).append(token)
+                if token.expanded:
+                    multiword.append(token)
+            self._by_lower, self._by_id, self._children, self._multiword = by_lower, by_id, children, multiword
+        return self
+
+
+    @property
+    def by_lower(self):
+        return self.index()._by_lower
+
+
+    @property
+    def by_id(self):
+        return self.index()._by_id
+
+
+    @property
+    def children(self):
+        return self.index()._children
+
+
+    @property
+    def multiword(self):
+        return self.index()._multiword
+
+
+    def first(self, lower):
+        """
+        Return the first token with lowercased text `lower`, or None.
+        """
+        if tokens := self.by_lower.get(lower):
+            return tokens[0]
+
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+    def __getitem__(self, i):
+        return self.tokens[i]
+
+
+def same_head(token_a, token_b):
+    """
+    True if both tokens have the same head. Multiword tokens have no head.
+    """
+    return token_a.head is not None and token_a.head == token_b.head
+
+
+def compact(tokens):
+    """
+    Convert a list of trankit token dicts into a `Sentence`. `Sentence`s are returned as they are.
+    """
+    return tokens if isinstance(tokens, Sentence) else Sentence(tokens)
+
+
+def load_sentences(parses, texts):
+    """
+    Return `{text: Sentence}` with the first sentences of the parses of `texts` from `parses` (e.g., `Parser.dict`).
+    Call `Parser.dict.release()` afterwards to free the full parses.
+    """
+    return {
+        text: Sentence.from_parse(parses[text])
+        for text in texts
+    }
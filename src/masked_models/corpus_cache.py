@@ -0,0 +1,152 @@
+"""
+Pre-tokenized sentence pairs for the masked LM scoring.
+
+The pairs (e.g., templated GEST sentences or the (male, female) pairs from `gender_variants.csv`) are tokenized once per
+tokenizer and saved as `.npy` arrays that are memory-mapped when loaded. The arrays are stored under the fingerprint
+of the tokenizer, so models that share a tokenizer share the cache:
+
+    corpus = TokenizedPairs.build(gender_variant_pairs(), tokenizer)
+    scores = pair_scores(corpus, tokenizer, model, device)
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from masked_models.scoring import mask_differences
+
+
+def tokenizer_fingerprint(tokenizer):
+    """
+    Hash of everything that decides the token ids: the serialized fast tokenizer (or the vocabulary of a slow one)
+    and the special tokens.
+    """
+    if getattr(tokenizer, 'is_fast', False):
+        description = tokenizer.backend_tokenizer.to_str()
+    else:
+        description = json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False) + repr(sorted(tokenizer.init_kwargs.items()))
+    description += f'{type(tokenizer).__name__}|{tokenizer.mask_token_id}|{tokenizer.pad_token_id}'
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+def pairs_fingerprint(pairs):
+    digest = hashlib.sha1()
+    for sen1, sen2 in pairs:
+        digest.update(f'{sen1}\0{sen2}\0'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def template_pairs(sentences, templates):
+    """
+    Return `(templates[0](sentence), templates[1](sentence))` pairs, e.g., for the English MLM templates.
+    """
+    return [(templates[0](sentence), templates[1](sentence)) for sentence in sentences]
+
+
+def gender_variant_pairs(path=os.path.join('data', 'gender_variants.csv')):
+    """
+    Return the (male, female) pairs from `gender_variants.csv`.
+    """
+    with open(path, newline='') as csv_file:
+        return [(row['male'], row['female']) for row in csv.DictReader(csv_file)]
+
+
+class TokenizedPairs:
+    """
+    Token ids of the sentences of a list of pairs and the masked positions of both directions of each pair. Arrays:
+
+    - `ids` - token ids of all the unique sentences concatenated, `offsets` - start of each sentence in `ids`
+    - `pairs` - indices of the two sentences of each pair
+    - `positions` - masked positions of the `(sen1, sen2)` directions followed by the `(sen2, sen1)` directions,
+      `position_offsets` - start of each direction in `positions`
+    """
+
+    arrays = ('ids', 'offsets', 'pairs', 'positions', 'position_offsets')
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'metadata.json'), 'r') as metadata_file:
+            self.metadata = json.load(metadata_file)
+        for name in self.arrays:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+
+    @classmethod
+    def build(cls, pairs, tokenizer, root=os.path.join('cache', 'tokenized'), batch_size=1024):
+        """
+        Load the tokenized `pairs` for `tokenizer` from `root`, tokenize and save them first if they are not cached.
+        """
+        pairs = list(pairs)
+        path = os.path.join(root, tokenizer_fingerprint(tokenizer), pairs_fingerprint(pairs))
+        if not os.path.exists(path):
+            cls.save(path, pairs, tokenizer, batch_size)
+        return cls(path)
+
+
+    @classmethod
+    def save(cls, path, pairs, tokenizer, batch_size=1024):
+        sentences = list(dict.fromkeys(sentence for pair in pairs for sentence in pair))
+        sentence_index = {sentence: i for i, sentence in enumerate(sentences)}
+
+        sentence_ids = []
+        for i in range(0, len(sentences), batch_size):
+            sentence_ids.extend(tokenizer(sentences[i: i + batch_size])['input_ids'])
+
+        pair_index = [(sentence_index[sen1], sentence_index[sen2]) for sen1, sen2 in pairs]
+        positions = [
+            mask_differences(sentence_ids[a], sentence_ids[b], tokenizer.mask_token_id)[1]
+            for a, b in pair_index + [(b, a) for a, b in pair_index]
+        ]
+
+        arrays = {
+            'ids': np.array([token for ids in sentence_ids for token in ids], dtype=np.int32),
+            'offsets': np.cumsum([0] + [len(ids) for ids in sentence_ids], dtype=np.int64),
+            'pairs': np.array(pair_index, dtype=np.int32).reshape(len(pairs), 2),
+            'positions': np.array([position for item in positions for position in item], dtype=np.int32),
+            'position_offsets': np.cumsum([0] + [len(item) for item in positions], dtype=np.int64),
+        }
+
+        # Write into a temporary directory first, so that an interrupted run does not leave an incomplete cache
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        with open(os.path.join(tmp_path, 'metadata.json'), 'w') as metadata_file:
+            json.dump({
+                'tokenizer': type(tokenizer).__name__,
+                'name_or_path': tokenizer.name_or_path,
+                'mask_token_id': tokenizer.mask_token_id,
+                'pairs': len(pairs),
+                'sentences': len(sentences),
+            }, metadata_file)
+        os.replace(tmp_path, path)
+
+
+    def __len__(self):
+        return len(self.pairs)
+
+
+    def sentence_ids(self, i):
+        return self.ids[self.offsets[i]: self.offsets[i + 1]].tolist()
+
+
+    def masked_items(self, reverse=False):
+        """
+        Return `(original_ids, masked_ids, positions)` items for `score_masked_ids`, for the `(sen1, sen2)` directions
+        of the pairs, or for the `(sen2, sen1)` directions if `reverse`.
+        """
+        mask_token_id = self.metadata['mask_token_id']
+        items = []
+        for pair_id, (a, b) in enumerate(self.pairs):
+            sentence, direction = (b, pair_id + len(self)) if reverse else (a, pair_id)
+            original_ids = self.sentence_ids(sentence)
+            positions = self.positions[self.position_offsets[direction]: self.position_offsets[direction + 1]].tolist()
+            masked_ids = list(original_ids)
+            for position in positions:
+                masked_ids[position] = mask_token_id
+            items.append((original_ids, masked_ids, positions))
+        return items
@@ -0,0 +1,153 @@
+"""
+Cache of the tokenizers and models used by the scoring sweeps.
+"""
+from collections import OrderedDict
+import gc
+import logging
+import os
+
+import torch
+from transformers import AutoModelForCausalLM, AutoModelForMaskedLM, AutoTokenizer
+
+
+def default_memory_budget(device=None):
+    """
+    Memory budget for the models on `device` in bytes: `MODEL_MEMORY_BUDGET` environment variable, or half of the
+    memory of the CUDA device, or half of the physical memory for CPU.
+    """
+    if 'MODEL_MEMORY_BUDGET' in os.environ:
+        return int(os.environ['MODEL_MEMORY_BUDGET'])
+    if device is not None and torch.device(device).type == 'cuda':
+        return torch.cuda.get_device_properties(device).total_memory // 2
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def model_size(model):
+    """
+    Memory taken by the parameters and buffers of `model` in bytes.
+    """
+    return sum(tensor.numel() * tensor.element_size() for tensor in (*model.parameters(), *model.buffers()))
+
+
+class ModelRegistry:
+    """
+    Loads each tokenizer, token id and model only once. Tokenizers and token ids are small and kept forever. Models
+    are kept per (handle, generative, dtype, device, `from_pretrained` kwargs) while the total size of the models on
+    their device fits into the budget of the device, the least recently used models on the device are released to make
+    room for new ones. `memory_budget` is the budget in bytes for every device, a function that returns the budget of
+    a device (e.g., `default_memory_budget`), or None for no limit. A model is loaded into the CPU memory first, its
+    size is known only then, so the models on its device are released before it is moved there. On CPU, the budget can
+    be exceeded by the model being loaded for the first time.
+
+    Models are loaded with `low_cpu_mem_usage=True`, so the weights from safetensors checkpoints are memory-mapped and
+    copied into the model directly, without allocating a randomly initialized model first.
+    """
+
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget
+        self.tokenizers = {}
+        self.token_ids = {}
+        self.models = OrderedDict()
+        self.sizes = {}
+        self.logger = logging.getLogger(__name__)
+
+
+    def tokenizer(self, handle, **kwargs):
+        key = (handle, tuple(sorted(kwargs.items())))
+        if key not in self.tokenizers:
+            self.tokenizers[key] = AutoTokenizer.from_pretrained(handle, **kwargs)
+        return self.tokenizers[key]
+
+
+    def token_id(self, token, handle):
+        """
+        Cached `masked_models.utils.token_id`.
+        """
+        key = (handle, token)
+        if key not in self.token_ids:
+            self.token_ids[key] = self.tokenizer(handle, add_prefix_space=True).encode(token)[-1]
+        return self.token_ids[key]
+
+
+    def model(self, handle, generative=False, dtype=None, device=None, **kwargs):
+        """
+        Return the model for `handle` (`AutoModelForCausalLM` if `generative`, `AutoModelForMaskedLM` otherwise) with
+        `dtype` weights on `device`. `kwargs` are passed to `from_pretrained` when the model is loaded.
+        """
+        # `repr` of the values, as some of them (e.g., `device_map` or `quantization_config`) are not hashable
+        key = (handle, generative, dtype, device, tuple(sorted((name, repr(value)) for name, value in kwargs.items())))
+        if key in self.models:
+            self.models.move_to_end(key)
+            return self.models[key]
+
+        self.evict(self.sizes.get(key, 0), device)
+
+        model_class = AutoModelForCausalLM if generative else AutoModelForMaskedLM
+        self.logger.info(f'Loading {handle}')
+        model = model_class.from_pretrained(handle, torch_dtype=dtype, low_cpu_mem_usage=True, **kwargs)
+        # The models on `device` are released before the new model is moved there
+        self.sizes[key] = model_size(model)
+        self.evict(self.sizes[key], device)
+        if device is not None:
+            model = model.to(device)
+        model.eval()
+
+        self.models[key] = model
+        return model
+
+
+    def memory(self):
+        """
+        Total size of the loaded models in bytes.
+        """
+        return sum(self.sizes[key] for key in self.models)
+
+
+    def budget(self, device):
+        if callable(self.memory_budget):
+            return self.memory_budget(device)
+        return self.memory_budget
+
+
+    def evict(self, space, device):
+        """
+        Release the least recently used models on `device` until `space` bytes fit into its budget.
+        """
+        budget = self.budget(device)
+        if budget is None:
+            return
+        memory = sum(self.sizes[key] for key in self.models if key[3] == device)
+        released = False
+        for key in list(self.models):
+            if memory + space <= budget:
+                break
+            if key[3] == device:
+                self.logger.info(f'Releasing {key[0]}')
+                del self.models[key]
+                memory -= self.sizes[key]
+                released = True
+        if released:
+            self.collect()
+
+
+    def release(self, handle=None):
+        """
+        Release all the models, or all the models of `handle`.
+        """
+        for key in list(self.models):
+            if handle is None or key[0] == handle:
+                del self.models[key]
+        self.collect()
+
+
+    @staticmethod
+    def collect():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+registry = ModelRegistry(default_memory_budget)
@@ -0,0 +1,254 @@
+"""
+Batched versions of the scoring functions from `masked_models.utils`.
+
+The scores are computed from the logits of the scored positions only: log-probabilities are `logit - logsumexp(logits)`
+in float32, so no full-vocabulary softmax is materialized. For the `MASKED_LM_HEADS` architectures the LM head is
+applied only to the hidden states of the scored positions, so the logits of the other positions are never computed. The forward passes run under `torch.inference_mode`,
+optionally with bfloat16 autocast (`bf16`).
+"""
+import contextlib
+import math
+
+import torch
+
+
+# Causal LMs whose logits are the output embeddings applied to the last hidden states of the base model
+LAST_HIDDEN_STATE_MODELS = {'gpt2', 'gpt_neox', 'llama', 'mistral', 'phi'}
+
+# Budget of the full logits of a batch (positions x vocabulary) for the masked LMs without a head in `MASKED_LM_HEADS`,
+# 2**26 float32 logits take 256 MB
+MAX_BATCH_LOGITS = 2**26
+
+# LM heads of the masked LMs, applied to the last hidden states of the base model
+MASKED_LM_HEADS = {
+    'albert': lambda model, hidden_states: model.predictions(hidden_states),
+    'bert': lambda model, hidden_states: model.cls(hidden_states),
+    'camembert': lambda model, hidden_states: model.lm_head(hidden_states),
+    'distilbert': lambda model, hidden_states: model.vocab_projector(model.vocab_layer_norm(model.activation(model.vocab_transform(hidden_states)))),
+    'electra': lambda model, hidden_states: model.generator_lm_head(model.generator_predictions(hidden_states)),
+    'roberta': lambda model, hidden_states: model.lm_head(hidden_states),
+    'xlm-roberta': lambda model, hidden_states: model.lm_head(hidden_states),
+    'xlm-roberta-xl': lambda model, hidden_states: model.lm_head(hidden_states),
+}
+
+
+def autocast(device, bf16=False):
+    if not bf16:
+        return contextlib.nullcontext()
+    return torch.autocast(torch.device(device).type, dtype=torch.bfloat16)
+
+
+def log10_probs(logits, targets):
+    """
+    Return log10 of `softmax(logits)` at `targets` for each row of `logits` (positions x vocabulary).
+    """
+    logits = logits.float()
+    return (logits.gather(1, targets[:, None])[:, 0] - torch.logsumexp(logits, dim=-1)) / math.log(10)
+
+
+def next_token_logits(model, input_ids, attention_mask, positions=None, **kwargs):
+    """
+    Return the logits of causal LM `model` at `positions` (the last position by default) of each sequence. For the
+    `LAST_HIDDEN_STATE_MODELS`, the output embeddings are applied only to the selected hidden states, so the logits of
+    the other positions are never computed. `kwargs` are passed to the model (e.g., `past_key_values`).
+    """
+    if positions is None:
+        positions = torch.full((input_ids.shape[0],), input_ids.shape[1] - 1, dtype=torch.long, device=input_ids.device)
+    rows = torch.arange(input_ids.shape[0], device=input_ids.device)
+
+    if model.config.model_type in LAST_HIDDEN_STATE_MODELS and isinstance(model.get_output_embeddings(), torch.nn.Linear):
+        hidden_states = model.base_model(input_ids=input_ids, attention_mask=attention_mask, **kwargs).last_hidden_state
+        return model.get_output_embeddings()(hidden_states[rows, positions])
+
+    return model(input_ids=input_ids, attention_mask=attention_mask, **kwargs).logits[rows, positions]
+
+
+def masked_lm_logits(model, input_ids, attention_mask, rows, columns):
+    """
+    Return the logits of masked LM `model` at the `(rows, columns)` positions. For the `MASKED_LM_HEADS` architectures,
+    the head is applied only to the hidden states of these positions. Other models compute the logits of all the
+    positions.
+    """
+    if model.config.model_type in MASKED_LM_HEADS:
+        hidden_states = model.base_model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        return MASKED_LM_HEADS[model.config.model_type](model, hidden_states[rows, columns])
+
+    return model(input_ids=input_ids, attention_mask=attention_mask).logits[rows, columns]
+
+
+def mask_differences(sen1_ids, sen2_ids, mask_token_id):
+    """
+    Return `sen1_ids` with the tokens that are different in `sen2_ids` replaced by `mask_token_id` (as
+    `tokenize_with_mask` does) and the masked positions.
+    """
+    masked_ids = list(sen1_ids)
+    for i, (sen1_token, sen2_token) in enumerate(zip(sen1_ids, sen2_ids)):
+        if sen1_token != sen2_token:
+            masked_ids[i] = mask_token_id
+    positions = [i for i, token in enumerate(masked_ids) if token == mask_token_id]
+    return masked_ids, positions
+
+
+def token_budget_batches(lengths, max_batch_tokens=4096, max_batch_size=256):
+    """
+    Split indices of sequences with `lengths` into batches of similar lengths. A padded batch has at most
+    `max_batch_tokens` tokens (a longer sequence gets a batch of its own) and at most `max_batch_size` sequences.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches, batch = [], []
+    for i in order:
+        if batch and ((len(batch) + 1) * lengths[batch[0]] > max_batch_tokens or len(batch) == max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def pad(sequences, pad_token_id, device):
+    """
+    Right-pad `sequences` of token ids into `input_ids` and `attention_mask` tensors.
+    """
+    length = max(map(len, sequences))
+    input_ids = torch.full((len(sequences), length), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), length), dtype=torch.long)
+    for i, sequence in enumerate(sequences):
+        input_ids[i, :len(sequence)] = torch.tensor(sequence, dtype=torch.long)
+        attention_mask[i, :len(sequence)] = 1
+    return input_ids.to(device), attention_mask.to(device)
+
+
+def score_masked_ids(items, tokenizer, model, device, max_batch_tokens=4096, max_batch_size=256, bf16=False):
+    """
+    Return `mask_logprob` for each `(original_ids, masked_ids, positions)` item, i.e., the mean log10 probability of
+    the original tokens at the masked `positions`. Models that compute the logits of all the positions (see
+    `masked_lm_logits`) get at most `MAX_BATCH_LOGITS // vocab_size` tokens per batch.
+    """
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+    scores = [None] * len(items)
+
+    if model.config.model_type not in MASKED_LM_HEADS:
+        max_batch_tokens = min(max_batch_tokens, max(1, MAX_BATCH_LOGITS // model.config.vocab_size))
+
+    lengths = [len(masked_ids) for _, masked_ids, _ in items]
+    for batch in token_budget_batches(lengths, max_batch_tokens, max_batch_size):
+        input_ids, attention_mask = pad([items[i][1] for i in batch], pad_token_id, device)
+
+        rows = torch.tensor([row for row, i in enumerate(batch) for _ in items[i][2]], dtype=torch.long, device=device)
+        columns = torch.tensor([position for i in batch for position in items[i][2]], dtype=torch.long, device=device)
+        targets = torch.tensor([items[i][0][position] for i in batch for position in items[i][2]], dtype=torch.long, device=device)
+
+        with torch.inference_mode(), autocast(device, bf16):
+            logprobs = log10_probs(masked_lm_logits(model, input_ids, attention_mask, rows, columns), targets)
+
+        for i, item_logprobs in zip(batch, logprobs.split([len(items[i][2]) for i in batch])):
+            scores[i] = torch.mean(item_logprobs).item()
+
+    return scores
+
+
+def masked_items(pairs, tokenizer):
+    """
+    Return the `(original_ids, masked_ids, positions)` items of `(sen1, sen2)` `pairs` for `score_masked_ids`. Each
+    sentence is tokenized only once. `pairs` can also be a pre-tokenized `corpus_cache.TokenizedPairs`.
+    """
+    if hasattr(pairs, 'masked_items'):
+        return pairs.masked_items()
+
+    sentences = list(dict.fromkeys(sentence for pair in pairs for sentence in pair))
+    ids = dict(zip(sentences, tokenizer(sentences)['input_ids']))
+
+    items = []
+    for sen1, sen2 in pairs:
+        masked_ids, positions = mask_differences(ids[sen1], ids[sen2], tokenizer.mask_token_id)
+        items.append((ids[sen1], masked_ids, positions))
+    return items
+
+
+def masked_logprob_scores(pairs, tokenizer, model, device, max_batch_tokens=4096, max_batch_size=256, bf16=False):
+    """
+    Batched `masked_logprob_score(sen1, sen2, ...)` for each `(sen1, sen2)` in `pairs` (or in a `TokenizedPairs`
+    corpus). The forward passes run in padded batches of at most `max_batch_tokens` tokens.
+    """
+    return score_masked_ids(masked_items(pairs, tokenizer), tokenizer, model, device, max_batch_tokens, max_batch_size, bf16)
+
+
+def pair_scores(pairs, tokenizer, model, device, max_batch_tokens=4096, max_batch_size=256, bf16=False):
+    """
+    Return `masked_logprob_score(sen1, sen2) - masked_logprob_score(sen2, sen1)` for each `(sen1, sen2)` in `pairs`
+    (or in a `TokenizedPairs` corpus), e.g., the (male, female) pairs of `english_mlm_score` and `slavic_mlm_score`.
+    Both directions of all the pairs are scored in the same batches.
+    """
+    if hasattr(pairs, 'masked_items'):
+        items = pairs.masked_items() + pairs.masked_items(reverse=True)
+    else:
+        pairs = list(pairs)
+        items = masked_items(pairs + [(sen2, sen1) for sen1, sen2 in pairs], tokenizer)
+
+    scores = score_masked_ids(items, tokenizer, model, device, max_batch_tokens, max_batch_size, bf16)
+    return [a - b for a, b in zip(scores[:len(pairs)], scores[len(pairs):])]
+
+
+def common_prefix_length(sequences):
+    """
+    Return the length of the longest common prefix of `sequences`.
+    """
+    length = min(map(len, sequences))
+    for i, tokens in enumerate(zip(*sequences)):
+        if any(token != tokens[0] for token in tokens):
+            return i
+    return length
+
+
+def expand_cache(past_key_values, batch_size):
+    """
+    Repeat a cache computed for a single sequence `batch_size` times (without copying). Handles the legacy tuples of
+    tensors and the `Cache` objects of newer `transformers`.
+    """
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return type(past_key_values).from_legacy_cache(expand_cache(past_key_values.to_legacy_cache(), batch_size))
+    if isinstance(past_key_values, torch.Tensor):
+        return past_key_values.expand(batch_size, *past_key_values.shape[1:])
+    return tuple(expand_cache(item, batch_size) for item in past_key_values)
+
+
+def generative_scores(samples, template, male_token_id, female_token_id, model, tokenizer, device, max_batch_tokens=4096, max_batch_size=64, bf16=False):
+    """
+    Batched `generative_score` for all `samples`. The prompts made by `template` share a constant prefix. Its
+    `past_key_values` are computed once and the rest of the prompts run in right-padded batches on top of them. The
+    logits are read at the last real token of each prompt.
+    """
+    ids = tokenizer([template(sample) for sample in samples])['input_ids']
+    if not ids:
+        return []
+
+    # Keep at least one token of each prompt out of the prefix to have the logits of the last position
+    prefix_length = min(common_prefix_length(ids), min(map(len, ids)) - 1)
+    suffixes = [sequence[prefix_length:] for sequence in ids]
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+    scores = [None] * len(samples)
+
+    with torch.inference_mode(), autocast(device, bf16):
+        past_key_values = None
+        if prefix_length:
+            prefix = torch.tensor([ids[0][:prefix_length]], dtype=torch.long, device=device)
+            past_key_values = model(input_ids=prefix, use_cache=True).past_key_values
+
+        lengths = [len(suffix) + prefix_length for suffix in suffixes]
+        for batch in token_budget_batches(lengths, max_batch_tokens, max_batch_size):
+            input_ids, attention_mask = pad([suffixes[i] for i in batch], pad_token_id, device)
+            positions = attention_mask.sum(dim=1) - 1
+
+            kwargs = {}
+            if past_key_values is not None:
+                kwargs['past_key_values'] = expand_cache(past_key_values, len(batch))
+                prefix_mask = torch.ones((len(batch), prefix_length), dtype=attention_mask.dtype, device=device)
+                attention_mask = torch.cat([prefix_mask, attention_mask], dim=1)
+
+            logits = next_token_logits(model, input_ids, attention_mask, positions, use_cache=True, **kwargs).float()
+            batch_scores = (logits[:, male_token_id] - logits[:, female_token_id]) / math.log(10)
+            for i, score in zip(batch, batch_scores.tolist()):
+                scores[i] = score
+
+    return scores
@@ -1,24 +1,33 @@
+import math
+
 import torch
-from transformers import AutoModelForMaskedLM, AutoTokenizer, AutoModelForCausalLM
+
+from masked_models.registry import registry
+from masked_models.scoring import autocast, next_token_logits, score_masked_ids
 
 
 def model_init(handle, generative=False):
     """
-    Initialize the model and tokenizer based on the `handle`
+    Initialize the model and tokenizer based on the `handle`. They are cached in `masked_models.registry.registry`,
+    so repeated calls for the same handle return the same objects.
     """
-    if generative:
-        model, tokenizer = AutoModelForCausalLM.from_pretrained(handle), AutoTokenizer.from_pretrained(handle)
-    else:
-        model, tokenizer = AutoModelForMaskedLM.from_pretrained(handle), AutoTokenizer.from_pretrained(handle)
-    if torch.cuda.is_available():
-        model = model.to('cuda:0')
-    return model, tokenizer
+    device = 'cuda:0' if torch.cuda.is_available() else None
+    return registry.model(handle, generative=generative, device=device), registry.tokenizer(handle)
 
 
-def masked_logprob_score(sen1, sen2, tokenizer, model, device, diagnose=False):
+def masked_logprob_score(sen1, sen2, tokenizer, model, device, diagnose=False, lean=False, bf16=False):
     """
     Calculate `mask_logprob` for `sen1`. The tokens that are different compared to `sen2` are masked.
+
+    `lean` - Compute the log-probabilities only for the masked positions with log-sum-exp under `inference_mode`
+    instead of the full softmax. `bf16` runs the lean mode with bfloat16 autocast. Ignored when diagnosing.
     """
+    if lean and not diagnose:
+        original_ids = tokenize(sen1, tokenizer, only_ids=True)
+        masked_ids = tokenize_with_mask(sen1, sen2, tokenizer, only_ids=True)
+        positions = [i for i, token in enumerate(masked_ids) if token == tokenizer.mask_token_id]
+        return score_masked_ids([(original_ids, masked_ids, positions)], tokenizer, model, device, bf16=bf16)[0]
+
     original_tokens = tokenize(sen1, tokenizer).to(device)
     masked_tokens = tokenize_with_mask(sen1, sen2, tokenizer).to(device)
     probs = model(**masked_tokens).logits.softmax(dim=-1)
@@ -63,14 +72,23 @@ def token_id(token, model_handle):
     >>> [1, 400, 400]
     ```
     """
-    tokenizer = AutoTokenizer.from_pretrained(model_handle, add_prefix_space=True)
-    token_ids = tokenizer.encode(token)
-    return token_ids[-1]
+    return registry.token_id(token, model_handle)
 
 
-def generative_score(sample, template, male_token_id, female_token_id, model, tokenizer, device):
+def generative_score(sample, template, male_token_id, female_token_id, model, tokenizer, device, lean=False, bf16=False):
+    """
+    `lean` - Compute only the logits of the last position under `inference_mode`. The score is the difference of
+    the two logits divided by ln(10), the normalization of the softmax cancels out. `bf16` runs the lean mode with
+    bfloat16 autocast.
+    """
     text = template(sample)
     tokens = tokenizer(text, return_tensors='pt').to(device)
+
+    if lean:
+        with torch.inference_mode(), autocast(device, bf16):
+            logits = next_token_logits(model, tokens['input_ids'], tokens['attention_mask'])[0].float()
+        return float((logits[male_token_id] - logits[female_token_id]) / math.log(10))
+
     logits = model(**tokens).logits[0][-1]
     probs = logits.softmax(dim=-1)
     male_prob = probs[male_token_id]
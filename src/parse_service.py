@@ -0,0 +1,178 @@
+"""
+Parallel parsing of multi-language workloads with a pool of worker processes.
+"""
+from collections import OrderedDict
+import gc
+import multiprocessing
+import os
+import queue
+import traceback
+
+from tqdm import tqdm
+
+from parser import Parser, parse_texts
+
+
+def _worker(task_queue, result_queue, embedding, max_pipelines):
+    """
+    Worker process loop. Tasks are `(language, texts, batch_size, threads)` tuples, `None` stops the worker. Results
+    are `(language, {text: parse}, error)` tuples sent once per parsed batch, `error` is a formatted traceback or None.
+    The worker keeps up to `max_pipelines` most recently used pipelines loaded.
+    """
+    import torch
+    from trankit import Pipeline
+
+    pipelines = OrderedDict()
+
+    while (task := task_queue.get()) is not None:
+        language, texts, batch_size, threads = task
+        torch.set_num_threads(threads)
+
+        try:
+            if language in pipelines:
+                pipelines.move_to_end(language)
+            else:
+                while max_pipelines and len(pipelines) >= max_pipelines:
+                    pipelines.popitem(last=False)
+                    gc.collect()
+                pipelines[language] = Pipeline(Parser.language_map[language], embedding=embedding)
+
+            for parses in parse_texts(pipelines[language], texts, batch_size):
+                result_queue.put((language, parses, None))
+
+        except Exception:
+            result_queue.put((language, {}, traceback.format_exc()))
+
+        result_queue.put((language, None, None))
+
+
+class ParseService:
+    """
+    Parses texts in several languages with a pool of `processes` worker processes. Each language is assigned to a
+    single worker (the least loaded one when the language is first seen), so the worker can keep its trankit pipeline
+    warm between `parse` calls. `memory_budget` (bytes) limits the total memory of the loaded pipelines: each worker
+    keeps at most `memory_budget // processes // pipeline_memory` pipelines and unloads the least recently used ones.
+    Pipelines with other embeddings are assumed to take `default_pipeline_memory`. Without the budget the pipelines are
+    never unloaded.
+
+    Each worker uses `threads_per_process` intra-op threads. By default, the cores are split among the workers that
+    have languages to parse in the current `parse` call, so fewer languages than processes still use all the cores.
+
+    Workers only parse, the parses are written into the per-language `Parser` caches by the main process, which is
+    the only writer of the caches. Each batch is committed as soon as it arrives, so an interrupted run keeps
+    everything parsed so far.
+
+        with ParseService(processes=9) as service:
+            service.parse({'pl': polish_texts, 'cs': czech_texts, ...})
+    """
+
+    # Approximate resident memory of a trankit pipeline with the given embedding
+    pipeline_memory = {
+        'xlm-roberta-base': 2 * 2**30,
+        'xlm-roberta-large': 4 * 2**30,
+    }
+    default_pipeline_memory = 4 * 2**30
+
+    def __init__(self, processes=None, memory_budget=None, embedding='xlm-roberta-base', threads_per_process=None, cache_path=None):
+        self.processes = processes or os.cpu_count()
+        self.embedding = embedding
+        self.cache_path = cache_path
+        self.threads_per_process = threads_per_process
+
+        if memory_budget:
+            pipeline_memory = self.pipeline_memory.get(embedding, self.default_pipeline_memory)
+            max_pipelines = max(1, memory_budget // self.processes // pipeline_memory)
+        else:
+            max_pipelines = None
+
+        context = multiprocessing.get_context('spawn')
+        self.result_queue = context.Queue()
+        self.task_queues = [context.Queue() for _ in range(self.processes)]
+        self.workers = [
+            context.Process(target=_worker, args=(task_queue, self.result_queue, embedding, max_pipelines), daemon=True)
+            for task_queue in self.task_queues
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        self.assignment = {}  # language -> worker index
+        self.worker_load = [0] * self.processes
+
+
+    def assign(self, language, size):
+        """
+        Return the index of the worker that parses `language`. New languages go to the least loaded worker.
+        """
+        if language not in self.assignment:
+            worker = min(range(self.processes), key=self.worker_load.__getitem__)
+            self.assignment[language] = worker
+        self.worker_load[self.assignment[language]] += size
+        return self.assignment[language]
+
+
+    def parse(self, workload, batch_size=64, chunk_size=1024):
+        """
+        Parse `workload` (`{language: texts}`) and return `{language: Parser}` with the parses cached in the parsers'
+        `dict`s. Texts that are already cached are not parsed again. Each worker gets its texts in chunks of
+        `chunk_size`.
+        """
+        parsers = {language: Parser(language, self.embedding, self.cache_path) for language in workload}
+
+        not_parsed = {
+            language: [text for text in dict.fromkeys(texts) if text not in parsers[language].dict]
+            for language, texts in workload.items()
+        }
+
+        languages = [language for language in not_parsed if not_parsed[language]]
+        languages.sort(key=lambda language: len(not_parsed[language]), reverse=True)
+        workers = {language: self.assign(language, len(not_parsed[language])) for language in languages}
+        threads = self.threads_per_process or max(1, os.cpu_count() // max(1, len(set(workers.values()))))
+
+        pending = 0
+        for language in languages:
+            texts = not_parsed[language]
+            for i in range(0, len(texts), chunk_size):
+                self.task_queues[workers[language]].put((language, texts[i: i + chunk_size], batch_size, threads))
+                pending += 1
+
+        with tqdm(total=sum(map(len, not_parsed.values()))) as progress_bar:
+            while pending:
+                try:
+                    language, parses, error = self.result_queue.get(timeout=10)
+                except queue.Empty:
+                    if not all(worker.is_alive() for worker in self.workers):
+                        raise RuntimeError('A parser worker process died.')
+                    continue
+
+                if error:
+                    raise RuntimeError(f'Parsing {language} failed in a worker process:\n{error}')
+
+                if parses is None:
+                    pending -= 1
+                    continue
+
+                parsers[language].dict.update(parses)
+                parsers[language].save()
+                progress_bar.update(len(parses))
+
+        return parsers
+
+
+    def close(self, terminate=False):
+        """
+        Stop the workers after they finish their tasks, or immediately with `terminate`.
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for worker in self.workers:
+            if terminate:
+                worker.terminate()
+            worker.join()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close(terminate=exc_type is not None)
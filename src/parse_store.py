@@ -0,0 +1,181 @@
+"""
+Persistent dict-like store for the parses made by `Parser`.
+"""
+from collections.abc import MutableMapping
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+
+
+class ParseStore(MutableMapping):
+    """
+    Parses are stored as zlib-compressed JSON in a SQLite database keyed by the SHA-1 digest of the parsed text and
+    by the `fingerprint` of the parser configuration that made them. A store is a view of the parses of a single
+    fingerprint, so several parser configurations (and processes) can share one database without mixing their
+    parses, and the parses of one configuration can be invalidated without touching the others.
+
+    Parses are decoded only when they are accessed, so memory and startup cost scale with the number of accessed
+    parses, not with the size of the store. New parses are written immediately, but they are made durable only by
+    `commit`.
+
+    The database is in the WAL mode, so readers are not blocked by a writer, and a writer waits up to `timeout` seconds
+    for the write lock held by another process. The writers should `commit` often, as each one holds the lock from its
+    first write until its `commit`. WAL needs shared memory, i.e., all the processes have to run on the same host.
+    """
+
+    timeout = 60
+
+    def __init__(self, path, fingerprint=''):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.fingerprint = fingerprint
+        self.connection = sqlite3.connect(path, timeout=self.timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS parses (
+                    fingerprint TEXT NOT NULL,
+                    digest BLOB NOT NULL,
+                    text TEXT NOT NULL,
+                    parse BLOB NOT NULL,
+                    PRIMARY KEY (fingerprint, digest)
+                )
+            ''')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY)')
+        self.cache = {}
+
+
+    @staticmethod
+    def digest(text):
+        return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+    @staticmethod
+    def encode(parse):
+        return zlib.compress(json.dumps(parse, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+    @staticmethod
+    def decode(blob):
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+    def __getitem__(self, text):
+        if text not in self.cache:
+            row = self.connection.execute(
+                'SELECT parse FROM parses WHERE fingerprint = ? AND digest = ?',
+                (self.fingerprint, self.digest(text)),
+            ).fetchone()
+            if row is None:
+                raise KeyError(text)
+            self.cache[text] = self.decode(row[0])
+        return self.cache[text]
+
+
+    def __setitem__(self, text, parse):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO parses VALUES (?, ?, ?, ?)',
+            (self.fingerprint, self.digest(text), text, self.encode(parse)),
+        )
+        self.cache[text] = parse
+
+
+    def __delitem__(self, text):
+        cursor = self.connection.execute(
+            'DELETE FROM parses WHERE fingerprint = ? AND digest = ?',
+            (self.fingerprint, self.digest(text)),
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(text)
+        self.cache.pop(text, None)
+
+
+    def __contains__(self, text):
+        return text in self.cache or self.connection.execute(
+            'SELECT 1 FROM parses WHERE fingerprint = ? AND digest = ?',
+            (self.fingerprint, self.digest(text)),
+        ).fetchone() is not None
+
+
+    def __iter__(self):
+        for text, in self.connection.execute('SELECT text FROM parses WHERE fingerprint = ?', (self.fingerprint,)):
+            yield text
+
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM parses WHERE fingerprint = ?', (self.fingerprint,)).fetchone()[0]
+
+
+    def commit(self):
+        self.connection.commit()
+
+
+    def release(self):
+        """
+        Forget the decoded parses kept in memory.
+        """
+        self.cache.clear()
+
+
+    def fingerprints(self):
+        """
+        Return `{fingerprint: number of parses}` for all the fingerprints in the database.
+        """
+        return dict(self.connection.execute('SELECT fingerprint, COUNT(*) FROM parses GROUP BY fingerprint'))
+
+
+    def invalidate(self, fingerprint=None):
+        """
+        Delete all the parses of `fingerprint` (this store's fingerprint by default) and return their number.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint
+        with self.connection:
+            count = self.connection.execute('DELETE FROM parses WHERE fingerprint = ?', (fingerprint,)).rowcount
+        if fingerprint == self.fingerprint:
+            self.cache.clear()
+        return count
+
+
+    def clear(self):
+        self.invalidate()
+
+
+    def import_legacy(self, path):
+        """
+        Import parses from a cache written by older versions of `Parser` (`results.json` or `results.sqlite` keyed
+        by text) under this store's fingerprint. Each file is imported only once, returns False if it was imported
+        before.
+        """
+        path = os.path.abspath(path)
+        if self.connection.execute('SELECT 1 FROM imports WHERE path = ?', (path,)).fetchone():
+            return False
+
+        if path.endswith('.json'):
+            with open(path, 'r') as json_file:
+                rows = ((text, self.encode(parse)) for text, parse in json.load(json_file).items())
+        else:
+            rows = sqlite3.connect(path).execute('SELECT text, parse FROM parses')
+
+        # Another process can import the same file concurrently, so the check is repeated under the write lock
+        self.commit()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            if not self.connection.execute('INSERT OR IGNORE INTO imports VALUES (?)', (path,)).rowcount:
+                return False
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO parses VALUES (?, ?, ?, ?)',
+                ((self.fingerprint, self.digest(text), text, blob) for text, blob in rows),
+            )
+        return True
+
+
+    def export_json(self, path):
+        """
+        Write all the parses of this store's fingerprint into a `results.json` file.
+        """
+        rows = self.connection.execute('SELECT text, parse FROM parses WHERE fingerprint = ?', (self.fingerprint,))
+        with open(path, 'w') as json_file:
+            json.dump({text: self.decode(blob) for text, blob in rows}, json_file)
@@ -1,12 +1,112 @@
-import json
+from importlib.metadata import version
 import os
 
 from tqdm import tqdm
 from trankit import Pipeline
 
+from parse_store import ParseStore
+
+# trankit splits documents into paragraphs on blank lines, we use them to separate the texts in a batch
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+def shift_spans(item, offset):
+    """
+    Return a copy of parse `item` (sentence, token or word) with its document spans (`dspan`) shifted by `-offset`.
+    """
+    item = dict(item)
+    if 'dspan' in item:
+        item['dspan'] = (item['dspan'][0] - offset, item['dspan'][1] - offset)
+    for key in ('tokens', 'expanded'):
+        if key in item:
+            item[key] = [shift_spans(child, offset) for child in item[key]]
+    return item
+
+
+def split_document_parse(document_parse, texts, offsets):
+    """
+    Split the parse of a document made by joining `texts` into the parses of the individual texts. `offsets` are the
+    character offsets of `texts` in the document. The results are the same as if the texts were parsed one by one.
+    """
+    parses = [
+        {
+            **{key: value for key, value in document_parse.items() if key not in ('text', 'sentences')},
+            'text': text,
+            'sentences': [],
+        }
+        for text in texts
+    ]
+
+    text_id = 0
+    for sentence in document_parse['sentences']:
+        start = sentence['dspan'][0]
+        while text_id + 1 < len(texts) and start >= offsets[text_id + 1]:
+            text_id += 1
+        sentence = shift_spans(sentence, offsets[text_id])
+        sentence['id'] = len(parses[text_id]['sentences']) + 1
+        parses[text_id]['sentences'].append(sentence)
+
+    return parses
+
+
+def parser_fingerprint(language, embedding):
+    """
+    Identify the parser configuration that makes the parses, e.g., `'pl/xlm-roberta-base/trankit-1.1.1'`.
+    """
+    return f'{language}/{embedding}/trankit-{version("trankit")}'
+
+
+def parse_batch(pipeline, texts):
+    """
+    Parse `texts` with trankit `pipeline` as a single document and return their parses.
+    """
+    offsets = []
+    offset = 0
+    for text in texts:
+        offsets.append(offset)
+        offset += len(text) + len(PARAGRAPH_SEPARATOR)
+
+    document_parse = pipeline.posdep(PARAGRAPH_SEPARATOR.join(texts))
+    return split_document_parse(document_parse, texts, offsets)
+
+
+def parse_texts(pipeline, texts, batch_size=64):
+    """
+    Parse `texts` with trankit `pipeline` and yield `{text: parse}` dicts, one per batch. Texts that contain line
+    breaks (or all texts if `batch_size` is 1) are parsed one by one.
+    """
+    single, batched = [], []
+    for text in texts:
+        if batch_size == 1 or not text.strip() or '\n' in text:
+            single.append(text)
+        else:
+            batched.append(text)
+
+    for text in single:
+        yield {text: pipeline.posdep(text)}
+
+    for i in range(0, len(batched), batch_size):
+        batch = batched[i: i + batch_size]
+        yield dict(zip(batch, parse_batch(pipeline, batch)))
+
+
 class Parser:
+    """
+    `parse` sends `batch_size` texts through the trankit pipeline at once. They are joined into a single document with
+    one paragraph per text, and the document parse is split back into per-text parses. Texts that contain line
+    breaks themselves are parsed one by one.
+
+    The parses are cached in a `ParseStore` (`dict`) that loads them on demand. All the languages and configurations
+    share one store in `cache_path` (`PARSER_CACHE_PATH` environment variable by default), the parses are keyed by
+    the text and by the `fingerprint` of the language, embedding and trankit version, so changing any of them does
+    not reuse stale parses. `dict.invalidate()` deletes the parses of the current configuration only.
 
-    cache_path = os.path.join('/','labs', 'cache', 'parser')
+    Per-language caches of older versions (`<language>/results.sqlite` or `results.json`) were made with the
+    default embedding, they are imported once under the current fingerprint.
+    """
+
+    cache_path = os.environ.get('PARSER_CACHE_PATH', os.path.join('/','labs', 'cache', 'parser'))
+    legacy_embedding = 'xlm-roberta-base'
 
     language_map = {
         'be': 'belarusian',
@@ -21,33 +121,41 @@ class Parser:
         'uk': 'ukrainian',
     }
 
-    def __init__(self, language, embedding='xlm-roberta-base'):
-        self.file_path = os.path.join(self.cache_path, language, 'results.json')
+    def __init__(self, language, embedding='xlm-roberta-base', cache_path=None):
+        if cache_path is not None:
+            self.cache_path = cache_path
+        self.file_path = os.path.join(self.cache_path, 'parses.sqlite')
         self.language = language
         self.embedding = embedding
+        self.fingerprint = parser_fingerprint(language, embedding)
         self.loaded = False
-        
-        if os.path.exists(self.file_path):
-            with open(self.file_path, 'r') as json_file:
-                self.dict = json.load(json_file)
-        else:
-            self.dict = {}
+
+        self.dict = ParseStore(self.file_path, self.fingerprint)
+        if embedding == self.legacy_embedding:
+            self.import_legacy()
+
+
+    def import_legacy(self):
+        for file_name in ('results.sqlite', 'results.json'):
+            legacy_path = os.path.join(self.cache_path, self.language, file_name)
+            if os.path.exists(legacy_path):
+                self.dict.import_legacy(legacy_path)
+                break
 
     def load_model(self):
         self.pipeline = Pipeline(self.language_map[self.language], embedding=self.embedding)
         return self
 
     
-    def parse(self, texts):
-        save = False
-        for text in tqdm(texts):
-            if text not in self.dict:
-                parse = self.pipeline.posdep(text)
-                self.dict[text] = parse
-                save = True
+    def parse(self, texts, batch_size=64):
+        not_parsed = list(dict.fromkeys(text for text in texts if text not in self.dict))
 
-        if save:
-            self.save()
+        with tqdm(total=len(not_parsed)) as progress_bar:
+            for parses in parse_texts(self.pipeline, not_parsed, batch_size):
+                self.dict.update(parses)
+                # Commit each batch to release the write lock of the shared store and to keep the finished batches
+                self.save()
+                progress_bar.update(len(parses))
 
         return {
             text: self.dict[text]
@@ -55,7 +163,12 @@ class Parser:
         }
 
     
+    def parse_batch(self, texts):
+        """
+        Parse `texts` as a single document and return their parses.
+        """
+        return parse_batch(self.pipeline, texts)
+
+
     def save(self):
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        with open(self.file_path, 'w') as json_file:
-            json.dump(self.dict, json_file)
+        self.dict.commit()
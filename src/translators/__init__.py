@@ -0,0 +1,36 @@
+"""
+Registry of the translation backends. The backend modules are imported only when a backend is requested, and the
+backends import their SDKs and read their credentials only with `enable_api=True` or `enable_inference=True`. Loading
+cached translations therefore needs no credentials and no heavy imports:
+
+    translator = load_translator('deepl', 'cs')
+    translator.translate(texts)
+"""
+import importlib
+
+
+translator_paths = {
+    'amazon_translate': 'translators.amazon_translate.AmazonTranslate',
+    'deepl': 'translators.deepl.DeepL',
+    'google_translate': 'translators.google_translate.GoogleTranslate',
+    'nllb': 'translators.nllb.NLLB',
+}
+
+
+def get_translator_class(name):
+    """
+    Return the translator class registered as `name`. Class names (e.g., `DeepL`) are accepted as well.
+    """
+    for key, path in translator_paths.items():
+        module_name, class_name = path.rsplit('.', 1)
+        if name in (key, class_name):
+            return getattr(importlib.import_module(module_name), class_name)
+    raise KeyError(f'Unknown translator "{name}". Available translators: {", ".join(translator_paths)}')
+
+
+def load_translator(name, target_language, **kwargs):
+    """
+    Create the translator registered as `name` and load its cached translations. `kwargs` are passed to the
+    constructor, e.g., `enable_api=True`.
+    """
+    return get_translator_class(name)(target_language, **kwargs).load()
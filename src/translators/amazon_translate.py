@@ -1,17 +1,19 @@
 import os
 
-import boto3
-
 from translators.translator import Translator
 
 
 class AmazonTranslate(Translator):
-    aws_access_key = open(os.path.join('config', 'aws_access_key')).read()
-    aws_secret_key = open(os.path.join('config', 'aws_secret_key')).read()
+    aws_access_key_path = os.path.join('config', 'aws_access_key')
+    aws_secret_key_path = os.path.join('config', 'aws_secret_key')
     region = 'us-west-2'
     dir_path = os.path.join('cache', 'translations', 'amazon_translate')
 
     supported_languages = ['cs', 'hr', 'pl', 'ru', 'sk', 'sl', 'sr', 'uk',]
+
+    # Conservative defaults, adjust them to the quota of your account
+    max_workers = 4
+    requests_per_second = 10
     
     
     def __init__(self, target_language, enable_api=False):
@@ -19,10 +21,16 @@ class AmazonTranslate(Translator):
         self.enable_api = enable_api
         
         if self.enable_api:
+            import boto3
+
+            with open(self.aws_access_key_path) as f:
+                aws_access_key = f.read()
+            with open(self.aws_secret_key_path) as f:
+                aws_secret_key = f.read()
             self.client = boto3.client(
                 'translate',
-                aws_access_key_id=self.aws_access_key,
-                aws_secret_access_key=self.aws_secret_key,
+                aws_access_key_id=aws_access_key,
+                aws_secret_access_key=aws_secret_key,
                 region_name=self.region
             )
 
@@ -31,7 +39,8 @@ class AmazonTranslate(Translator):
         """
         Sometimes this function return errors, e.g., texts in Sorani Kurdish cause BadRequest (as of July 2022).
         
-        This function could be optimized in the future by sending multiple texts at the same time. According to API documentation, 5K character requests are optimal: https://cloud.google.com/translate/quotas
+        `TranslateText` accepts only a single text per request. Multiple sentences could be joined into one text, but
+        then they would be translated in a shared context, which would influence the gender of the translations.
         """
         
         if not self.enable_api:
@@ -44,3 +53,12 @@ class AmazonTranslate(Translator):
         )
         
         return response['TranslatedText']
+
+
+    def is_throttling_error(self, exception):
+        if not self.enable_api:
+            return False
+
+        from botocore.exceptions import ClientError
+
+        return isinstance(exception, ClientError) and exception.response['Error']['Code'] in ('ThrottlingException', 'TooManyRequestsException')
@@ -0,0 +1,156 @@
+"""
+Storage backends for the translations made by `Translator`. Each backend stores the translations for one
+translator-language pair in `data_path`. `translations.csv` with `from` and `to` columns is the canonical format that
+all the backends can import and export.
+"""
+import csv
+import json
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+def read_csv(path):
+    """
+    Read `translations.csv` into a `{from: to}` dict.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return {
+                row['from']: row['to']
+                for row in csv.DictReader(f)
+            }
+    except FileNotFoundError:
+        return {}
+
+
+def write_csv(path, translations):
+    """
+    Atomically write `{from: to}` dict as `translations.csv`. The file is written to a temporary file first, so a crash
+    during the write can not corrupt the existing file.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['from', 'to'])
+        writer.writerows(translations.items())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CsvCache:
+    """
+    The translations are kept only in `translations.csv`, that is rewritten on each `save`. New translations are lost
+    if the process crashes before `save` is called.
+    """
+
+    def __init__(self, data_path):
+        self.csv_path = os.path.join(data_path, 'translations.csv')
+
+
+    def load(self):
+        return read_csv(self.csv_path)
+
+
+    def append(self, text, translation):
+        pass
+
+
+    def save(self, translations, compact=False):
+        write_csv(self.csv_path, translations)
+
+
+    def import_csv(self, path):
+        """
+        Add translations from an existing `translations.csv` file.
+        """
+        self.save({**self.load(), **read_csv(path)})
+
+
+    def export_csv(self, path):
+        write_csv(path, self.load())
+
+
+class JournalCache(CsvCache):
+    """
+    `translations.csv` is used as a snapshot and each new translation is durably appended to the `translations.jsonl`
+    journal as soon as it is created. `save` is cheap, it only compacts the journal into the snapshot once it has
+    `compact_every` entries, or when `compact` is set (e.g., by an explicit `Translator.save`).
+    """
+
+    compact_every = 1000
+
+    def __init__(self, data_path, compact_every=None, fsync=True):
+        super().__init__(data_path)
+        self.journal_path = os.path.join(data_path, 'translations.jsonl')
+        self.compact_every = compact_every or self.compact_every
+        self.fsync = fsync
+        self.journal_size = 0
+        self.journal_file = None
+
+
+    def load(self):
+        translations = read_csv(self.csv_path)
+        self.journal_size = 0
+
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f'Skipping a corrupted line in {self.journal_path}: {line!r}')
+                        continue
+                    translations[record['from']] = record['to']
+                    self.journal_size += 1
+        except FileNotFoundError:
+            pass
+
+        return translations
+
+
+    def append(self, text, translation):
+        if self.journal_file is None:
+            self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            # Terminate a line torn by a crash, so that the new record does not end up on the same line
+            if self.journal_file.tell() > 0 and not self.ends_with_newline():
+                self.journal_file.write('\n')
+        self.journal_file.write(json.dumps({'from': text, 'to': translation}, ensure_ascii=False) + '\n')
+        self.journal_file.flush()
+        if self.fsync:
+            os.fsync(self.journal_file.fileno())
+        self.journal_size += 1
+
+
+    def ends_with_newline(self):
+        with open(self.journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+
+    def save(self, translations, compact=False):
+        if compact or self.journal_size >= self.compact_every:
+            self.compact(translations)
+
+
+    def compact(self, translations):
+        """
+        Write all `translations` into the snapshot and truncate the journal.
+        """
+        write_csv(self.csv_path, translations)
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        open(self.journal_path, 'w').close()
+        self.journal_size = 0
+
+
+    def import_csv(self, path):
+        """
+        Add translations from an existing `translations.csv` file. They are written into the snapshot at once, not
+        appended to the journal one by one.
+        """
+        self.compact({**self.load(), **read_csv(path)})
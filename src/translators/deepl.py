@@ -17,37 +17,64 @@ https://www.deepl.com/docs-api/translate-text/translate-text
 """
 import os
 
-# See: https://github.com/DeepLcom/deepl-python
-import deepl
-
 from translators.translator import Translator
 
 
 class DeepL(Translator):
     
-    auth_key = open(os.path.join('config', 'deepl.auth')).read()
+    auth_key_path = os.path.join('config', 'deepl.auth')
     dir_path = os.path.join('cache', 'translations', 'deepl')
 
     supported_languages = ['cs', 'pl', 'ru', 'sk', 'sl', 'uk',]
 
+    # Up to 50 texts can be sent in one request, the total request size is limited to 128 KiB
+    max_batch_size = 50
+    max_batch_characters = 100000
+
+    # Conservative defaults, adjust them to your subscription
+    max_workers = 4
+    requests_per_second = 5
+
 
     def __init__(self, target_language, enable_api=False, server_url=None):
         super().__init__(target_language)
         self.enable_api = enable_api
         
         if self.enable_api:
-            self.client = deepl.Translator(self.auth_key, server_url=server_url)
+            # See: https://github.com/DeepLcom/deepl-python
+            import deepl
+
+            with open(self.auth_key_path) as f:
+                auth_key = f.read()
+            self.client = deepl.Translator(auth_key, server_url=server_url)
 
     
     def _call_translation(self, text):
+        return self._call_translations([text])[0]
+
+
+    def _call_translations(self, texts):
         
         if not self.enable_api:
-            raise RuntimeError(f'This translator object does not have an API access enabled. Use `DeepL(enable_api=True)` if you wish to access DeepL API. You tried to translate: "{text}"')
+            raise RuntimeError(f'This translator object does not have an API access enabled. Use `DeepL(enable_api=True)` if you wish to access DeepL API. You tried to translate: "{texts}"')
         
         response = self.client.translate_text(
-            text,
+            texts,
             source_lang='EN',
             target_lang=self.target_language.upper(),
         )
         
-        return response.text
+        return [result.text for result in response]
+
+
+    def is_throttling_error(self, exception):
+        """
+        Note that `QuotaExceededException` (the monthly character quota is used up) is not retried.
+        """
+        # Without the API access the SDK does not have to be installed and no request can be throttled
+        if not self.enable_api:
+            return False
+
+        import deepl
+
+        return isinstance(exception, deepl.TooManyRequestsException)
@@ -0,0 +1,63 @@
+"""
+Local stand-in for the API backends, used for benchmarking and testing the `Translator` workflow without network
+access or spending.
+"""
+import os
+import random
+import threading
+import time
+
+from translators.translator import Translator
+
+
+class FakeThrottlingError(Exception):
+    status_code = 429
+
+
+class FakeError(Exception):
+    pass
+
+
+class FakeTranslator(Translator):
+    """
+    "Translates" texts by tagging them with the target language. Each request sleeps for `latency` seconds, fails with
+    `FakeThrottlingError` (HTTP 429) with `throttle_rate` probability and with `FakeError` with `error_rate`
+    probability. `max_batch_size` and `max_batch_characters` set the batch limits of the fake API.
+    """
+
+    dir_path = os.path.join('cache', 'translations', 'fake')
+
+    def __init__(self, target_language, dir_path=None, latency=0.0, error_rate=0.0, throttle_rate=0.0, max_batch_size=1, max_batch_characters=5000, seed=None):
+        if dir_path is not None:
+            self.dir_path = dir_path
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_batch_size = max_batch_size
+        self.max_batch_characters = max_batch_characters
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.request_count = 0
+        super().__init__(target_language)
+
+
+    def _call_translation(self, text):
+        return self._call_translations([text])[0]
+
+
+    def _call_translations(self, texts):
+        if len(texts) > self.max_batch_size or sum(map(len, texts)) > max(self.max_batch_characters, len(texts[0])):
+            raise FakeError(f'Request is over the batch limits: {len(texts)} texts')
+
+        with self.random_lock:
+            self.request_count += 1
+            draw = self.random.random()
+
+        if self.latency:
+            time.sleep(self.latency)
+        if draw < self.throttle_rate:
+            raise FakeThrottlingError('Too many requests')
+        if draw < self.throttle_rate + self.error_rate:
+            raise FakeError('Bad request')
+
+        return [f'[{self.target_language}] {text}' for text in texts]
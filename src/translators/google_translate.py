@@ -26,10 +26,6 @@ https://googleapis.dev/python/translation/latest/client.html
 """
 import os
 
-# v2 is a basic translation, there is also v3, but it's not needed for our use-cases
-# See: https://cloud.google.com/translate/docs/editions
-from google.cloud import translate_v2
-
 from translators.translator import Translator
 
 
@@ -39,6 +35,14 @@ class GoogleTranslate(Translator):
     dir_path = os.path.join('cache', 'translations', 'google_translate')
 
     supported_languages = ['be', 'cs', 'hr', 'pl', 'ru', 'sk', 'sl', 'sr', 'uk',]
+
+    # According to API documentation, 5K character requests are optimal and at most 128 segments can be sent at once: https://cloud.google.com/translate/quotas
+    max_batch_size = 128
+    max_batch_characters = 5000
+
+    # Conservative defaults, adjust them to the quota of your project
+    max_workers = 4
+    requests_per_second = 10
     
     
     def __init__(self, target_language, enable_api=False):
@@ -46,24 +50,47 @@ class GoogleTranslate(Translator):
         self.enable_api = enable_api
         
         if self.enable_api:
+            # v2 is a basic translation, there is also v3, but it's not needed for our use-cases
+            # See: https://cloud.google.com/translate/docs/editions
+            from google.cloud import translate_v2
+
             self.client = translate_v2.Client.from_service_account_json(self.auth_key_path)
 
     
     def _call_translation(self, text):
         """
         Sometimes this function return errors, e.g., texts in Sorani Kurdish cause BadRequest (as of July 2022).
-        
-        This function could be optimized in the future by sending multiple texts at the same time. According to API documentation, 5K character requests are optimal: https://cloud.google.com/translate/quotas
+        """
+        return self._call_translations([text])[0]
+
+
+    def _call_translations(self, texts):
+        """
+        Translate multiple texts with a single request. The API returns the translations in the order of `texts`.
         """
         
         if not self.enable_api:
-            raise RuntimeError(f'This translator object does not have an API access enabled. Use `GoogleTranslate(enable_api=True)` if you wish to access Google API. You tried to translate: "{text}"')
+            raise RuntimeError(f'This translator object does not have an API access enabled. Use `GoogleTranslate(enable_api=True)` if you wish to access Google API. You tried to translate: "{texts}"')
         
         response = self.client.translate(
-            text,
+            texts,
             source_language='en',
             target_language=self.target_language,
             format_='text',  # `text` is needed because default `format_='html'` escapes special characters
         )
         
-        return response['translatedText']
+        return [result['translatedText'] for result in response]
+
+
+    def is_throttling_error(self, exception):
+        """
+        Exceeded quotas are reported either as 429 or as 403 with `rateLimitExceeded` reason.
+        """
+        if not self.enable_api:
+            return False
+
+        from google.api_core import exceptions as google_exceptions
+
+        if isinstance(exception, google_exceptions.TooManyRequests):
+            return True
+        return isinstance(exception, google_exceptions.Forbidden) and 'rateLimitExceeded' in str(exception)
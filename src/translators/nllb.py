@@ -1,9 +1,13 @@
 
+from collections import OrderedDict, deque
+import gc
+import itertools
 import json
+import multiprocessing
 import os
-import pandas as pd
+import queue
 import re
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+import traceback
 
 from translators.translator import Translator
 
@@ -11,6 +15,20 @@ from translators.translator import Translator
 class NLLB(Translator):
     """
     A class for creating a translator model using the NLLB200 model.
+
+    Texts are translated in batches. They are sorted by their length in tokens and packed so that a padded batch has at
+    most `max_batch_tokens` tokens, which minimizes the compute wasted on padding.
+
+    Loaded models are shared by all the `NLLB` objects in the process, i.e., one model serves all the target languages.
+    The target language is selected for each batch via the forced BOS token. At most `max_loaded_models` models are
+    kept loaded, the least recently used one is evicted when another one is needed. Use `NLLB.release_models()` to free
+    the memory explicitly.
+
+    With `processes=N`, the batches are translated by N worker processes, each with its own model and
+    `threads_per_process` intra-op threads (`os.cpu_count() // processes` by default). Each worker translates one batch
+    at a time and the translations are streamed back into the cache as the batches finish. If a worker dies, only its
+    batch is lost: the worker is restarted and the batch is retried, at most `max_retries` times. The texts of a batch
+    that failed with an exception are retried one by one by the running workers.
     """
 
     dir_path = os.path.join('cache', 'translations', 'nllb_3b')
@@ -28,27 +46,84 @@ class NLLB(Translator):
     }
 
     supported_languages = ['be', 'cs', 'hr', 'pl', 'ru', 'sk', 'sl', 'sr', 'uk',]
+
+    max_batch_size = 32
+    max_batch_tokens = 2048
+    max_length = 512
+
+    max_loaded_models = 1
+    _models = OrderedDict()  # (model_name, device) -> (tokenizer, model)
+    _tokenizers = {}
      
-    def __init__(self, target_language, variant='3.3B', device='cpu', enable_inference=False): 
+    def __init__(self, target_language, variant='3.3B', device='cpu', enable_inference=False, processes=None, threads_per_process=None): 
         super().__init__(target_language)
         self.target_language = self.language_map[target_language]
         self.model_name = self.get_model_name(variant)
         self.device = device
         self.enable_inference = enable_inference
+        self.processes = processes
+        self.threads_per_process = threads_per_process or (max(1, os.cpu_count() // processes) if processes else None)
+
+        if self.enable_inference and not self.processes:
+            self.load_model(self.model_name, self.device)
+
+
+    @classmethod
+    def load_tokenizer(cls, model_name):
+        if model_name not in cls._tokenizers:
+            from transformers import AutoTokenizer
+
+            cls._tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name, src_lang='eng_Latn')
+        return cls._tokenizers[model_name]
+
 
-        if self.enable_inference:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
-            self.pipeline = pipeline(
-                'translation',
-                model=self.model,
-                tokenizer=self.tokenizer,
-                src_lang='eng_Latn',
-                tgt_lang=self.target_language,
-                device=self.device,
-                max_length=512,
-                no_repeat_ngram_size=3,
-            )
+    @classmethod
+    def load_model(cls, model_name, device):
+        """
+        Return `(tokenizer, model)` for `model_name` on `device`. The model is loaded only if it is not loaded already.
+        """
+        key = (model_name, device)
+        if key in cls._models:
+            cls._models.move_to_end(key)
+            return cls._models[key]
+
+        while cls._models and len(cls._models) >= cls.max_loaded_models:
+            cls._models.popitem(last=False)
+            gc.collect()
+
+        from transformers import AutoModelForSeq2SeqLM
+
+        tokenizer = cls.load_tokenizer(model_name)
+        # `low_cpu_mem_usage` avoids materializing a randomly initialized copy of the weights, safetensors checkpoints are memory-mapped
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, low_cpu_mem_usage=True).to(device)
+        model.eval()
+        cls._models[key] = tokenizer, model
+        return cls._models[key]
+
+
+    @classmethod
+    def release_models(cls, model_name=None):
+        """
+        Unload all the models, or only the models of `model_name`.
+        """
+        for key in list(cls._models):
+            if model_name in (None, key[0]):
+                del cls._models[key]
+        gc.collect()
+
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+    @property
+    def tokenizer(self):
+        return self.load_tokenizer(self.model_name)
+
+
+    @property
+    def model(self):
+        return self.load_model(self.model_name, self.device)[1]
 
         
     def get_model_name(self, variant):
@@ -63,12 +138,180 @@ class NLLB(Translator):
         return f'facebook/nllb-200-{variants[variant]}'
         
         
+    def batches(self, texts):
+        """
+        Sort `texts` by their length in tokens and pack them into batches with at most `max_batch_size` texts and
+        `max_batch_tokens` tokens after padding.
+        """
+        if not self.enable_inference:
+            yield from super().batches(texts)
+            return
+
+        texts = list(texts)
+        lengths = dict(zip(texts, map(len, self.load_tokenizer(self.model_name)(texts)['input_ids'])))
+
+        batch, longest = [], 0
+        for text in sorted(texts, key=lengths.get):
+            longest = max(longest, lengths[text])
+            if batch and (len(batch) >= self.max_batch_size or (len(batch) + 1) * longest > self.max_batch_tokens):
+                yield batch
+                batch, longest = [], lengths[text]
+            batch.append(text)
+        if batch:
+            yield batch
+
+
     def _call_translation(self, text):
+        return self._call_translations([text])[0]
+
+
+    def _call_translations(self, texts):
         """
         Translates batch of texts and returns the translated batch of texts.
         """
         if not self.enable_inference:
-            raise RuntimeError(f'This translator object does not have inference enabled. Use `NLLB(enable_inference=True)` if you wish to run inference. You tried to translate: "{text}"')
-            
-        result = self.pipeline(text, max_length=512)
-        return result[0]['translation_text']
+            raise RuntimeError(f'This translator object does not have inference enabled. Use `NLLB(enable_inference=True)` if you wish to run inference. You tried to translate: "{texts}"')
+
+        tokenizer, model = self.load_model(self.model_name, self.device)
+        return generate_translations(tokenizer, model, texts, self.target_language, self.device, self.max_length)
+
+
+    def _run_batches(self, batches, workers):
+        if not self.processes:
+            yield from super()._run_batches(batches, workers)
+            return
+
+        if not self.enable_inference:
+            raise RuntimeError('This translator object does not have inference enabled. Use `NLLB(enable_inference=True)` if you wish to run inference.')
+
+        pending = deque((batch, 0) for batch in batches)
+        in_flight = {}  # worker index -> (task id, batch, attempts)
+        task_ids = itertools.count()
+
+        pool = WorkerPool(self.processes, self.model_name, self.device, self.threads_per_process)
+        try:
+            while pending or in_flight:
+                # Only the batch of a dead worker is lost, the worker is restarted and the batch is retried
+                for i in pool.dead_workers():
+                    self.logger.warning(f'NLLB worker {i} died, restarting it')
+                    pool.restart(i)
+                    if i in in_flight:
+                        _, batch, attempts = in_flight.pop(i)
+                        if attempts >= self.max_retries:
+                            exception = RuntimeError(f'NLLB worker died while translating a batch of {len(batch)} texts')
+                            yield batch, [(text, None, exception) for text in batch]
+                        else:
+                            pending.appendleft((batch, attempts + 1))
+
+                for i in range(self.processes):
+                    if i not in in_flight and pending:
+                        batch, attempts = pending.popleft()
+                        in_flight[i] = next(task_ids), batch, attempts
+                        pool.submit(i, in_flight[i][0], batch, self.target_language, self.max_length)
+
+                try:
+                    task_id, translations, error = pool.result_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+
+                # Results from a worker that died after sending them are stale, its batch was already requeued
+                worker = next((i for i, (i_task_id, _, _) in in_flight.items() if i_task_id == task_id), None)
+                if worker is None:
+                    continue
+                _, batch, attempts = in_flight.pop(worker)
+
+                if error is not None:
+                    if len(batch) > 1:
+                        self.logger.info(f'Batched translation of {len(batch)} texts failed, falling back to single texts')
+                        pending.extend(([text], attempts) for text in batch)
+                    else:
+                        yield batch, [(batch[0], None, RuntimeError(f'Translation failed in a worker process:\n{error}'))]
+                    continue
+
+                yield batch, list(zip(batch, translations, [None] * len(batch)))
+        finally:
+            pool.close(terminate=bool(pending or in_flight))
+
+
+class WorkerPool:
+    """
+    `processes` worker processes, each with its own task queue and its own copy of the model. The results of all the
+    workers are sent to `result_queue`. A dead worker is restarted with a new task queue, the other workers are not
+    affected.
+    """
+
+    def __init__(self, processes, model_name, device, threads):
+        self.args = model_name, device, threads
+        self.context = multiprocessing.get_context('spawn')
+        self.result_queue = self.context.Queue()
+        self.task_queues = [None] * processes
+        self.workers = [None] * processes
+        for i in range(processes):
+            self.start(i)
+
+
+    def start(self, i):
+        self.task_queues[i] = self.context.Queue()
+        self.workers[i] = self.context.Process(target=_worker, args=(self.task_queues[i], self.result_queue, *self.args), daemon=True)
+        self.workers[i].start()
+
+
+    def restart(self, i):
+        self.workers[i].join()
+        self.start(i)
+
+
+    def dead_workers(self):
+        return [i for i, worker in enumerate(self.workers) if not worker.is_alive()]
+
+
+    def submit(self, i, task_id, texts, target_language, max_length):
+        self.task_queues[i].put((task_id, texts, target_language, max_length))
+
+
+    def close(self, terminate=False):
+        """
+        Stop the workers after they finish their tasks, or immediately with `terminate`.
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for worker in self.workers:
+            if terminate:
+                worker.terminate()
+            worker.join()
+
+
+def generate_translations(tokenizer, model, texts, target_language, device, max_length):
+    """
+    Translate a batch of `texts` to `target_language` (NLLB language code).
+    """
+    import torch
+
+    inputs = tokenizer(texts, return_tensors='pt', padding=True).to(device)
+    with torch.inference_mode():
+        outputs = model.generate(
+            **inputs,
+            forced_bos_token_id=tokenizer.convert_tokens_to_ids(target_language),
+            max_length=max_length,
+            no_repeat_ngram_size=3,
+        )
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True, clean_up_tokenization_spaces=False)
+
+
+def _worker(task_queue, result_queue, model_name, device, threads):
+    """
+    Worker process loop. Tasks are `(task_id, texts, target_language, max_length)` tuples, `None` stops the worker.
+    Results are `(task_id, translations, error)` tuples, `error` is a formatted traceback or None.
+    """
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    while (task := task_queue.get()) is not None:
+        task_id, texts, target_language, max_length = task
+        try:
+            tokenizer, model = NLLB.load_model(model_name, device)
+            result_queue.put((task_id, generate_translations(tokenizer, model, texts, target_language, device, max_length), None))
+        except Exception:
+            result_queue.put((task_id, None, traceback.format_exc()))
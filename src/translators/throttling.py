@@ -0,0 +1,65 @@
+"""
+Helpers for calling rate-limited translation APIs from multiple threads: a token-bucket rate limiter and retries with
+exponential backoff.
+"""
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter. `rate` tokens are added per second up to `capacity` tokens. Each request
+    takes one token and waits if there is none left. `rate=None` disables the limit.
+    """
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self):
+        if self.rate is None:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+                self.timestamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def backoff_delay(attempt, base=1.0, maximum=60.0):
+    """
+    Exponential backoff with full jitter: a random delay from [0, base * 2^attempt], capped at `maximum` seconds.
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def call_with_retries(call, is_retryable, rate_limiter=None, max_retries=5, backoff_base=1.0, logger=None):
+    """
+    Call `call()` and retry it with exponential backoff when it raises an exception for which `is_retryable` is True.
+    The last exception is re-raised when the retries are exhausted.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return call()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base=backoff_base)
+            if logger is not None:
+                logger.info(f'Request was throttled ({type(e).__name__}), retrying in {delay:.1f}s')
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,122 @@
+"""
+Append-only log of all the translations made by a translator for one language. It is kept for auditing, the
+translations themselves are served from `translators.cache`.
+
+The records are stored as JSON lines in `log.jsonl`. `log.idx` holds the byte offset of each record as an 8-byte
+integer, so counting the records and reading the n-th record are O(1).
+"""
+import json
+import os
+import struct
+import time
+
+
+OFFSET = struct.Struct('<Q')
+
+
+class TranslationLog:
+
+    def __init__(self, data_path):
+        self.log_path = os.path.join(data_path, 'log.jsonl')
+        self.index_path = os.path.join(data_path, 'log.idx')
+        self.log_file = None
+        self.index_file = None
+
+        # Drop a partially written index entry, e.g., after a crash
+        if os.path.exists(self.index_path) and (size := os.path.getsize(self.index_path)) % OFFSET.size:
+            os.truncate(self.index_path, size - size % OFFSET.size)
+
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.index_path) // OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+
+    def __getitem__(self, i):
+        """
+        Return the `i`-th record as a dict with `id`, `from`, `to` and `time` (UNIX timestamp) keys.
+        """
+        length = len(self)
+        if i < 0:
+            i += length
+        if not 0 <= i < length:
+            raise IndexError(i)
+
+        with open(self.index_path, 'rb') as index_file:
+            index_file.seek(i * OFFSET.size)
+            offset, = OFFSET.unpack(index_file.read(OFFSET.size))
+        with open(self.log_path, 'rb') as log_file:
+            log_file.seek(offset)
+            return json.loads(log_file.readline())
+
+
+    def __iter__(self):
+        if not len(self):
+            return
+        with open(self.index_path, 'rb') as index_file, open(self.log_path, 'rb') as log_file:
+            while chunk := index_file.read(OFFSET.size):
+                offset, = OFFSET.unpack(chunk)
+                log_file.seek(offset)
+                yield json.loads(log_file.readline())
+
+
+    def append(self, text, translation, timestamp=None):
+        if self.log_file is None:
+            self.log_file = open(self.log_path, 'ab')
+            self.index_file = open(self.index_path, 'ab')
+
+        record = {
+            'id': len(self) + 1,
+            'from': text,
+            'to': translation,
+            'time': time.time() if timestamp is None else timestamp,
+        }
+        offset = self.log_file.seek(0, os.SEEK_END)
+
+        # The record is written before its index entry, so a crash can leave only an unreachable record behind
+        self.log_file.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.log_file.flush()
+        self.index_file.write(OFFSET.pack(offset))
+        self.index_file.flush()
+
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.index_file.close()
+            self.log_file = self.index_file = None
+
+
+def migrate_log_directory(legacy_path, log, remove=False):
+    """
+    Append the translations from the legacy `logs/` directory with `<n>.from` and `<n>.to` files into `log` in the
+    order of their counters. The modification time of the `.to` file is used as the timestamp. With `remove=True` the
+    migrated files and the directory are deleted.
+
+    Returns the number of migrated translations.
+    """
+    counters = sorted(
+        int(f[:-3])
+        for f in os.listdir(legacy_path)
+        if f.endswith('.to')
+    )
+
+    for counter in counters:
+        from_path = os.path.join(legacy_path, f'{counter}.from')
+        to_path = os.path.join(legacy_path, f'{counter}.to')
+        with open(from_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        with open(to_path, 'r', encoding='utf-8') as f:
+            translation = f.read()
+        log.append(text, translation, timestamp=os.path.getmtime(to_path))
+
+    if remove:
+        for counter in counters:
+            os.remove(os.path.join(legacy_path, f'{counter}.from'))
+            os.remove(os.path.join(legacy_path, f'{counter}.to'))
+        if not os.listdir(legacy_path):
+            os.rmdir(legacy_path)
+
+    return len(counters)
@@ -1,19 +1,39 @@
 """
 This module defines the `Translator` class, which is an abstract base class for translation models.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict
 
 import logging
 import os
 
-import pandas as pd
 import tqdm
 import traceback
 
+from translators.cache import JournalCache
+from translators.throttling import TokenBucket, call_with_retries
+from translators.translation_log import TranslationLog
+
 
 logging.basicConfig(level=logging.INFO)
 
 
+def pack_batches(texts, max_characters, max_size):
+    """
+    Greedily pack `texts` into batches with at most `max_size` texts and at most `max_characters` characters in total.
+    A text that is longer than `max_characters` is put into a batch of its own.
+    """
+    batch, batch_characters = [], 0
+    for text in texts:
+        if batch and (len(batch) >= max_size or batch_characters + len(text) > max_characters):
+            yield batch
+            batch, batch_characters = [], 0
+        batch.append(text)
+        batch_characters += len(text)
+    if batch:
+        yield batch
+
+
 class Translator:
     """
     An abstract class for translation models.
@@ -25,7 +45,33 @@ class Translator:
         `NLLB200Translator`
 
     The main call for `Translator` is translate. This function translates required texts and save them to a csv file. 
+
+    Backends that can translate multiple texts with one request override `_call_translations` and set the request
+    budget via `max_batch_size` (number of texts) and `max_batch_characters`.
+
+    Requests are sent from `max_workers` threads. They are rate limited with a token bucket (`requests_per_second`,
+    `burst`) and throttled requests are retried with exponential backoff (`max_retries`, `retry_backoff` seconds).
+    All of these can be overridden per backend or per instance.
+
+    The translations are stored by `cache_class` (see `translators.cache`). Each new translation is written to the
+    cache as soon as it is created. `translate(..., save=True)` only persists the state that is not durable yet, an
+    explicit `save()` also compacts the cache, i.e., writes `translations.csv`.
+
+    Loaded translations are kept in `dict` (`{from: to}`). `dataframe` is built from it lazily and is meant only for
+    analysis.
     """
+    max_batch_size = 1
+    max_batch_characters = 5000
+
+    max_workers = 1
+    requests_per_second = None
+    burst = None
+    max_retries = 5
+    retry_backoff = 1.0
+
+    cache_class = JournalCache
+    show_progress = True
+
     def __init__(self, target_language):
         """
         Initialize the Translator class.
@@ -34,68 +80,74 @@ class Translator:
         self.data_path = os.path.join(self.dir_path, target_language)
         self.csv_path = os.path.join(self.data_path, 'translations.csv')
         os.makedirs(self.data_path, exist_ok=True)
-        
-        self.log_path = os.path.join(self.data_path, 'logs')
-        os.makedirs(self.log_path, exist_ok=True)
-        self.log_counter = max(
-            [
-                int(f[:-3])
-                for f in os.listdir(self.log_path)
-                if f.endswith('.to')
-            ],
-            default=0,
-        ) + 1
+        self.cache = self.cache_class(self.data_path)
+        self.log = TranslationLog(self.data_path)
         
         self.logger = logging.getLogger(__name__)
+        self.rate_limiter = TokenBucket(self.requests_per_second, self.burst)
         self.loaded = False
         
 
     def load(self):
-        try:
-            self.dataframe = pd.read_csv(self.csv_path, na_values=[]).set_index('from')
-        except FileNotFoundError:
-            self.dataframe = pd.DataFrame(columns=['from', 'to']).set_index('from')
+        self.dict = self.cache.load()
+        self._dataframe = None
         self.loaded = True
-        self.logger.info(f'Loaded translations: {len(self.dataframe)}')
+        self.logger.info(f'Loaded translations: {len(self.dict)}')
         return self
+
+
+    @property
+    def dataframe(self):
+        """
+        `from`-indexed DataFrame with the translations. It is rebuilt only after new translations were added.
+        """
+        if self._dataframe is None:
+            import pandas as pd
+
+            self._dataframe = pd.DataFrame(
+                {'to': list(self.dict.values())},
+                index=pd.Index(list(self.dict.keys()), name='from'),
+            )
+        return self._dataframe
     
     
-    def save(self) -> None:
-        self.dataframe.to_csv(self.csv_path)
-        self.logger.info(f'Saved translations: {len(self.dataframe)}')
+    def save(self, compact=True) -> None:
+        self.cache.save(self.dict, compact=compact)
+        self.logger.info(f'Saved translations: {len(self.dict)}')
         
         
     def log_translation(self, text, translation):
-        with open(os.path.join(self.log_path, f'{self.log_counter}.from'), 'w', encoding='utf-8') as f:
-            f.write(text)
-        with open(os.path.join(self.log_path, f'{self.log_counter}.to'), 'w', encoding='utf-8') as f:
-            f.write(translation)
-        self.log_counter += 1
+        """
+        Legacy `logs/` directories can be moved into the log with `translators.translation_log.migrate_log_directory`.
+        """
+        self.log.append(text, translation)
 
     
-    def translate(self, texts, graceful=1, save=False):
+    def translate(self, texts, graceful=1, save=False, workers=None):
         """
-        `graceful`:
+        Throttled requests are retried with exponential backoff. `graceful` decides what happens with the remaining
+        errors, i.e., non-throttling errors and requests that are still throttled after `max_retries` retries:
           - 0 - Exceptions will stop the translation
           - 1 - Exceptions will NOT stop the translation, but they will be logged
           - 2 - Exceptions will be ignored
+
+        `workers` - Number of requests in flight, `max_workers` by default.
         """
         
         if not self.loaded:
             raise RuntimeError
             
-        not_translated = set(texts) - set(self.dataframe.index)
+        not_translated = list(dict.fromkeys(text for text in texts if text not in self.dict))
         if not_translated:
-            translations = self.create_translations(not_translated, graceful, save)
-            self.dataframe = pd.concat([self.dataframe, translations])
+            self.create_translations(not_translated, graceful, save, workers)
 
             if save:
-                self.save()
+                self.save(compact=False)
             
         translations = {
-            text: self.dataframe.loc[text].to
+            text: self.dict[text]
             for text in texts
-            if text in self.dataframe.index
+            if text in self.dict
         }
         
         if (diff := len(set(texts)) - len(translations)) > 0:
@@ -104,31 +156,120 @@ class Translator:
         return translations
 
         
-    def create_translations(self, texts, graceful=1, save=False):
-        translations = pd.DataFrame(columns=['from', 'to']).set_index('from')
+    def create_translations(self, texts, graceful=1, save=False, workers=None):
+        """
+        Translate `texts`, add the translations to `dict` and return them.
+        """
+        translations = {}
+        texts = list(texts)
 
-        for text in tqdm.tqdm(texts):
-            try:
-                translation = self._call_translation(text)
-                
-            except Exception as e:
-                if graceful == 0:
-                    if save:
-                        self.dataframe = pd.concat([self.dataframe, translations])     
-                        self.save()
-                    raise e
-                if graceful == 1:
-                    self.logger.warning(f'The following exception has occured during the translation of: "{text}"\n\n{traceback.format_exc()}')
-                continue
-            
-            self.log_translation(text, translation)
-            translations.loc[text] = translation
-            
+        with tqdm.tqdm(total=len(texts), disable=not self.show_progress) as progress_bar:
+            for batch, results in self._run_batches(self.batches(texts), workers or self.max_workers):
+                for text, translation, exception in results:
+                    
+                    if exception is not None:
+                        if graceful == 0:
+                            if save:
+                                self.save(compact=False)
+                            raise exception
+                        if graceful == 1:
+                            formatted_exception = ''.join(traceback.format_exception(exception))
+                            self.logger.warning(f'The following exception has occured during the translation of: "{text}"\n\n{formatted_exception}')
+                        continue
+
+                    self.cache.append(text, translation)
+                    self.log_translation(text, translation)
+                    self.dict[text] = translations[text] = translation
+                    self._dataframe = None
+
+                progress_bar.update(len(batch))
             
         self.logger.info(f'New translations: {len(translations)}')
         
         return translations
 
+
+    def batches(self, texts):
+        """
+        Split `texts` into batches that can be sent to the backend with a single request.
+        """
+        return pack_batches(texts, self.max_batch_characters, self.max_batch_size)
+
+
+    def _run_batches(self, batches, workers):
+        """
+        Translate `batches` from `workers` threads and yield `(batch, results)` pairs as the batches are finished, where
+        `results` are the `(text, translation, exception)` triples from `_call_batch`.
+        """
+        with ThreadPoolExecutor(workers) as executor:
+            futures = {
+                executor.submit(self._call_batch, batch): batch
+                for batch in batches
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+
+    def _call_batch(self, batch):
+        """
+        Translate `batch` with a single request and return `(text, translation, exception)` triples in the original
+        order. If the batched request fails, we fall back to translating the texts one by one, so that a single
+        problematic text does not cost us the whole batch.
+
+        This is called from worker threads, so it must not modify the state of the translator.
+        """
+        if len(batch) > 1:
+            try:
+                translations = self._request(self._call_translations, batch)
+                if len(translations) != len(batch):
+                    raise RuntimeError(f'Expected {len(batch)} translations, got {len(translations)}')
+                return [(text, translation, None) for text, translation in zip(batch, translations)]
+            except Exception as e:
+                if self.is_throttling_error(e):
+                    return [(text, None, e) for text in batch]
+                self.logger.info(f'Batched translation of {len(batch)} texts failed, falling back to single requests')
+
+        results = []
+        for text in batch:
+            try:
+                results.append((text, self._request(self._call_translation, text), None))
+            except Exception as e:
+                results.append((text, None, e))
+        return results
+
+
+    def _request(self, call, *args):
+        """
+        Send a single rate-limited request, retrying it if it is throttled.
+        """
+        return call_with_retries(
+            lambda: call(*args),
+            is_retryable=self.is_throttling_error,
+            rate_limiter=self.rate_limiter,
+            max_retries=self.max_retries,
+            backoff_base=self.retry_backoff,
+            logger=self.logger,
+        )
+
+
+    def is_throttling_error(self, exception):
+        """
+        Return True if `exception` means that the backend is throttling us and the request should be retried later.
+        Backends override this for their SDK exceptions, by default we look for an HTTP 429 status code.
+        """
+        return 429 in (getattr(exception, 'status_code', None), getattr(exception, 'code', None))
+
+
+    def _call_translations(self, texts):
+        """
+        Translate several texts with a single request. Backends that support multi-text requests should override this,
+        the default implementation simply translates the texts one by one.
+        """
+        return [self._call_translation(text) for text in texts]
+
     
     def _call_translation(self, text):
         raise NotImplementedError